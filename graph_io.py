@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+圖譜數據加載工具
+功能：
+1. 從 node-link 格式的 JSON 文件 (graph_analysis_data.json) 流式重建 NetworkX 圖
+2. 在 JSON 旁維護 pickle 緩存 (<json>.pkl)，JSON 未更新時直接載入已構建好的圖，
+   跳過逐個節點 / 邊重建的 nx.node_link_graph
+3. 將圖的鄰接關係轉換為 NumPy CSR 數組 (GraphCSR)，供鄰居遍歷與度數計算使用
+"""
+
+import ijson
+import networkx as nx
+import numpy as np
+import os
+import pickle
+
+PICKLE_PROTOCOL = 5
+
+
+def _stream_node_link_graph(json_file):
+    """以 ijson 流式讀取 node-link JSON，逐個節點 / 邊直接加入圖中
+
+    與 nx.node_link_graph 的結果相同，但不在內存中保留整份解析後的 JSON，
+    峰值內存只有圖本身。圖的標記 (directed / multigraph / graph) 位於文件開頭，讀取開銷很小。
+    """
+    with open(json_file, 'rb') as f:
+        # 缺省值與 nx.node_link_graph 一致
+        multigraph = next(ijson.items(f, 'multigraph'), True)
+        f.seek(0)
+        directed = next(ijson.items(f, 'directed'), False)
+        f.seek(0)
+        graph_attrs = next(ijson.items(f, 'graph', use_float=True), {})
+
+        G = nx.MultiGraph() if multigraph else nx.Graph()
+        if directed:
+            G = G.to_directed()
+        G.graph.update(graph_attrs)
+
+        f.seek(0)
+        G.add_nodes_from((node.pop('id'), node) for node in ijson.items(f, 'nodes.item', use_float=True))
+
+        f.seek(0)
+        links = ijson.items(f, 'links.item', use_float=True)
+        if multigraph:
+            G.add_edges_from((link.pop('source'), link.pop('target'), link.pop('key', None), link) for link in links)
+        else:
+            G.add_edges_from((link.pop('source'), link.pop('target'), link) for link in links)
+
+    return G
+
+
+def load_graph_file(json_file):
+    """加載圖譜，優先使用不舊於 JSON 文件的 pickle 緩存"""
+    pkl_file = json_file + '.pkl'
+
+    if os.path.exists(pkl_file) and os.path.getmtime(pkl_file) >= os.path.getmtime(json_file):
+        try:
+            with open(pkl_file, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # 緩存損壞或由不兼容的 networkx 版本寫入，回退至 JSON
+            pass
+
+    G = _stream_node_link_graph(json_file)
+
+    # 先寫臨時文件再替換，避免中斷時留下不完整的緩存
+    tmp_file = pkl_file + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(G, f, protocol=PICKLE_PROTOCOL)
+        os.replace(tmp_file, pkl_file)
+    except OSError:
+        pass
+
+    return G
+
+
+class GraphCSR:
+    """有向圖鄰接關係的 CSR (壓縮稀疏行) 數組表示
+
+    節點按 G.nodes() 的順序編號為 0..N-1 (nodes[i] 為編號 i 的節點)。
+    節點 i 的出邊為 out_dst[out_ptr[i]:out_ptr[i + 1]]，權重在 out_weight 的同一區間；
+    入邊同理 (in_ptr / in_src / in_weight)。degree[i] 與 G.degree(nodes[i]) 相同。
+    """
+
+    def __init__(self, G, weight='weight', default=1):
+        self.nodes = list(G.nodes())
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+
+        index = self.index
+        num_edges = G.number_of_edges()
+        src = np.fromiter((index[u] for u, _ in G.edges()), dtype=np.int64, count=num_edges)
+        dst = np.fromiter((index[v] for _, v in G.edges()), dtype=np.int64, count=num_edges)
+        # 權重保持原始的數值類型 (全為整數時為整數數組)，顯示結果與原屬性一致
+        weights = np.array([attrs.get(weight, default) for _, _, attrs in G.edges(data=True)])
+
+        num_nodes = len(self.nodes)
+        self.out_ptr, self.out_dst, self.out_weight = self._compress(src, dst, weights, num_nodes)
+        self.in_ptr, self.in_src, self.in_weight = self._compress(dst, src, weights, num_nodes)
+        self.degree = np.diff(self.out_ptr) + np.diff(self.in_ptr)
+
+    @staticmethod
+    def _compress(rows, cols, values, num_nodes):
+        """按行排序並計算行指針，返回 (ptr, cols, values)"""
+        order = np.argsort(rows, kind='stable')
+        ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=ptr[1:])
+        return ptr, cols[order], values[order]
+
+    def neighbors(self, i):
+        """返回節點 i 的所有鄰居編號及對應邊權重 (不分出入，雙向相連的鄰居出現兩次)"""
+        out_start, out_end = self.out_ptr[i], self.out_ptr[i + 1]
+        in_start, in_end = self.in_ptr[i], self.in_ptr[i + 1]
+        return (
+            np.concatenate((self.out_dst[out_start:out_end], self.in_src[in_start:in_end])),
+            np.concatenate((self.out_weight[out_start:out_end], self.in_weight[in_start:in_end]))
+        )
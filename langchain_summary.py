@@ -1,33 +1,14 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-import json
-import os
-from dotenv import load_dotenv
-
-# 載入 .env 檔案
-load_dotenv()
-
-# 1. 設定 DeepSeek API (使用 OpenAI 兼容模式)
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
-
-# 驗證 API Key
-if not DEEPSEEK_API_KEY:
-    raise ValueError(
-        "❌ 錯誤：未設置 DEEPSEEK_API_KEY。\n"
-        "請在 .env 檔案中設置：DEEPSEEK_API_KEY=your-api-key\n"
-        "或複製 .env.example 為 .env 並填入你的 API Key"
-    )
+from llm_client import NON_STREAMING_REQUEST_TIMEOUT, get_llm
+import ijson
+import orjson
+import tiktoken
 
-# 2. 初始化 DeepSeek LLM
-llm = ChatOpenAI(
-    model="deepseek-chat",
-    openai_api_key=DEEPSEEK_API_KEY,
-    openai_api_base=DEEPSEEK_BASE_URL,
-    temperature=0.1
-)
+# 1. 初始化 DeepSeek LLM (未設置 DEEPSEEK_API_KEY 時拋出 ValueError)
+# 總結與合併均為非流式調用，使用覆蓋整個生成過程的超時，而非流式調用的 20 秒停頓上限
+llm = get_llm(timeout=NON_STREAMING_REQUEST_TIMEOUT)
 
-# 3. 定義提示詞模板
+# 2. 定義提示詞模板
 system_prompt = """你是一個專業的對話分析助手。
 請分析給定的對話內容，按照以下格式進行總結：
 
@@ -42,39 +23,85 @@ system_prompt = """你是一個專業的對話分析助手。
 請用結構化的方式回答，每一項都要清晰列出。
 """
 
-# 4. 讀取 JSON 檔案
+# 合併各分塊總結時使用的提示詞
+reduce_prompt = """你是一個專業的對話分析助手。
+以下是同一段對話按時間順序分塊後得到的多份總結，請將它們合併為一份完整的總結，
+保持相同的格式（参与者、时间、地点、主题、关键词、行动项、情感基调），並去除重複的內容。
+
+請用結構化的方式回答，每一項都要清晰列出。
+"""
+
+# 每個分塊的 token 上限 (以 GPT-4 的分詞器估算，與 DeepSeek 足夠接近)
+CHUNK_TOKEN_LIMIT = 6000
+# 同時發送給 DeepSeek 的最大請求數
+MAX_CONCURRENCY = 8
+
+encoding = tiktoken.encoding_for_model("gpt-4")
+
+# 3. 流式讀取 JSON 檔案，按 token 預算將對話貪心地打包為分塊
 print("正在讀取對話記錄...")
-with open("1__formatted_template.json", "r", encoding="utf-8") as f:
-    messages_data = json.load(f)
-
-# 5. 取前 20 句對話並格式化為文字
-conversation_lines = []
-for i, msg in enumerate(messages_data[:20]):
-    role = msg["role"]
-    content = msg["content"]
-    speaker = "User" if role == "user" else "Assistant"
-    conversation_lines.append(f"{speaker}: {content}")
-
-conversation = "\n".join(conversation_lines)
-print(f"已讀取 {len(conversation_lines)} 條對話\n")
-
-# 6. 構建訊息
-messages = [
-    SystemMessage(content=system_prompt),
-    HumanMessage(content=f"請分析以下對話並進行總結：\n\n{conversation}")
-]
+chunks = []
+chunk_lines = []
+chunk_tokens = 0
+message_count = 0
+with open("1__formatted_template.json", "rb") as f:
+    for msg in ijson.items(f, "item"):
+        speaker = "User" if msg["role"] == "user" else "Assistant"
+        line = f"{speaker}: {msg['content']}"
+        # disallowed_special=(): 對話中出現 <|endoftext|> 等特殊標記字符串時按普通文本計數，而非拋出 ValueError
+        line_tokens = len(encoding.encode(line, disallowed_special=())) + 1  # 加上換行符
+
+        if chunk_lines and chunk_tokens + line_tokens > CHUNK_TOKEN_LIMIT:
+            chunks.append("\n".join(chunk_lines))
+            chunk_lines = []
+            chunk_tokens = 0
 
-# 7. 呼叫 LLM
+        chunk_lines.append(line)
+        chunk_tokens += line_tokens
+        message_count += 1
+
+if chunk_lines:
+    chunks.append("\n".join(chunk_lines))
+
+if not chunks:
+    raise ValueError("❌ 錯誤：對話記錄為空，無法生成總結。")
+
+print(f"已讀取 {message_count} 條對話，分為 {len(chunks)} 個分塊\n")
+
+# 4. Map: 併發總結每個分塊
 print("正在分析對話並生成總結...\n")
-response = llm.invoke(messages)
+chunk_messages = [
+    [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"請分析以下對話並進行總結：\n\n{chunk}")
+    ]
+    for chunk in chunks
+]
+chunk_summaries = [
+    r.content for r in llm.batch(chunk_messages, config={"max_concurrency": MAX_CONCURRENCY})
+]
+
+# 5. Reduce: 多個分塊時再合併為一份總結
+if len(chunk_summaries) == 1:
+    summary = chunk_summaries[0]
+else:
+    print(f"正在合併 {len(chunk_summaries)} 份分塊總結...\n")
+    combined = "\n\n".join(
+        f"【第 {i} 段總結】\n{text}" for i, text in enumerate(chunk_summaries, 1)
+    )
+    response = llm.invoke([
+        SystemMessage(content=reduce_prompt),
+        HumanMessage(content=combined)
+    ])
+    summary = response.content
 
-# 8. 保存結果到 JSON
+# 6. 保存結果到 JSON
 output_data = {
-    "summary": response.content,
-    "analyzed_messages_count": len(conversation_lines)
+    "summary": summary,
+    "analyzed_messages_count": message_count
 }
 
-with open("summary.json", "w", encoding="utf-8") as f:
-    json.dump(output_data, f, ensure_ascii=False, indent=2)
+with open("summary.json", "wb") as f:
+    f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
 
 print("總結已保存至 summary.json")
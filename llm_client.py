@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+DeepSeek LLM 客戶端
+功能：
+1. 從 .env / 環境變數讀取 DeepSeek API 設置
+2. 提供進程內共享的 ChatOpenAI 實例 (get_llm)
+
+所有腳本共用同一個實例及其 HTTP 連接池，在同一進程中串聯多個步驟
+（如 總結 → 三元組抽取）時可重用與 DeepSeek 之間的 keep-alive 連接。
+"""
+
+import os
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+# 載入 .env 檔案
+load_dotenv()
+
+# 設定 DeepSeek API (使用 OpenAI 兼容模式)
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+DEEPSEEK_MODEL = "deepseek-chat"
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+
+# 共享的 HTTP 連接池: 多個請求重用與 DeepSeek 之間的 keep-alive 連接，避免每次重新握手
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60.0)
+
+# 單次請求超時: 讀取超時為相鄰兩次收到數據之間的最長間隔 (流式響應逐塊重置)，
+# 卡住的請求會被及時中斷並由客戶端以指數退避重試 (包括 429 / 5xx)。
+# 只適用於流式調用 (三元組抽取、搜索的問題分析)；非流式調用在生成完畢前收不到任何數據
+REQUEST_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+
+# 非流式調用 (如長對話的總結與合併) 的單次請求超時，須覆蓋整個生成過程
+NON_STREAMING_REQUEST_TIMEOUT = httpx.Timeout(300.0, connect=5.0)
+MAX_RETRIES = 3
+
+_llm = None
+
+
+def get_llm(timeout=None):
+    """返回共享的 DeepSeek LLM 實例，首次調用時創建
+
+    指定 timeout 時返回綁定了該單次請求超時的實例 (仍共用同一連接池)，
+    供非流式調用使用，例如 get_llm(timeout=NON_STREAMING_REQUEST_TIMEOUT)。
+    """
+    global _llm
+    if _llm is None:
+        if not DEEPSEEK_API_KEY:
+            raise ValueError(
+                "❌ 錯誤：未設置 DEEPSEEK_API_KEY。\n"
+                "請在 .env 檔案中設置：DEEPSEEK_API_KEY=your-api-key\n"
+                "或複製 .env.example 為 .env 並填入你的 API Key"
+            )
+
+        _llm = ChatOpenAI(
+            model=DEEPSEEK_MODEL,
+            openai_api_key=DEEPSEEK_API_KEY,
+            openai_api_base=DEEPSEEK_BASE_URL,
+            temperature=LLM_TEMPERATURE,
+            timeout=REQUEST_TIMEOUT,
+            max_retries=MAX_RETRIES,
+            http_client=httpx.Client(limits=HTTP_LIMITS, timeout=REQUEST_TIMEOUT),
+            http_async_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=REQUEST_TIMEOUT)
+        )
+    if timeout is not None:
+        return _llm.bind(timeout=timeout)
+    return _llm
@@ -8,14 +8,35 @@
 3. 顯示實體詳細信息及其關係網絡
 """
 
-import json
-import networkx as nx
 import os
+from collections import defaultdict
+from graph_io import GraphCSR, load_graph_file
+import heapq
+import numpy as np
+from prompt_toolkit import PromptSession
+from prompt_toolkit.history import FileHistory
+
+# 匹配多個實體時先只顯示摘要，按需展開社區及關係詳情
+USE_LAZY_TRAVERSE = True
+
+# 搜索輸入歷史 (上下鍵瀏覽，跨會話保存)
+SEARCH_HISTORY_FILE = os.path.expanduser("~/.graph_search_history")
+
+def _relation_summary(edge_attrs):
+    """簡化關係描述顯示：只取第一行，無描述時顯示「相關」"""
+    rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
+    return rel_desc.split('\n', 1)[0] if rel_desc else "相關"
 
 class GraphSearcher:
     def __init__(self, json_file="graph_analysis_data.json"):
         self.json_file = json_file
         self.G = None
+        self._csr = None
+        self._community_code = None
+        self._community_members = {}
+        self._names_lower = None
+        # 懶加載顯示詢問展開哪些節點時使用的輸入函數 (main 中替換為 PromptSession.prompt，保留歷史與行編輯)
+        self.prompt = input
         self.load_graph()
 
     def load_graph(self):
@@ -27,11 +48,9 @@ class GraphSearcher:
 
         try:
             print(f"📂 正在加載圖譜數據: {self.json_file} ...")
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # 重建 NetworkX 圖
-            self.G = nx.node_link_graph(data)
+            # 重建 NetworkX 圖 (JSON 未更新時直接載入 pickle 緩存)
+            self.G = load_graph_file(self.json_file)
+            self._build_index()
             print(f"✅ 圖譜加載成功!")
             print(f"   - 節點數: {self.G.number_of_nodes()}")
             print(f"   - 邊數: {self.G.number_of_edges()}")
@@ -40,6 +59,24 @@ class GraphSearcher:
             print(f"❌ 加載失敗: {e}")
             return False
 
+    def _build_index(self):
+        """預先建立 社區 -> 成員、節點 -> 度數 及小寫節點名稱索引，避免每次查詢都掃描全圖"""
+        self._csr = GraphCSR(self.G)
+
+        # 社區 -> 成員節點編號數組，以及每個節點所屬社區的整數編碼
+        members = defaultdict(list)
+        codes = {}
+        community_code = []
+        for i, (node, attrs) in enumerate(self.G.nodes(data=True)):
+            community = attrs.get('community')
+            members[community].append(i)
+            community_code.append(codes.setdefault(community, len(codes)))
+        self._community_members = {c: np.array(ids, dtype=np.int64) for c, ids in members.items()}
+        self._community_code = np.array(community_code, dtype=np.int64)
+
+        # 小寫節點名稱打包為 NumPy 字符串數組，子字串匹配以 np.char.find 在 C 層逐元素完成
+        self._names_lower = np.array([str(node).lower() for node in self._csr.nodes], dtype=str)
+
     def search(self, query):
         """搜索節點並顯示相關信息"""
         if not self.G:
@@ -52,13 +89,10 @@ class GraphSearcher:
         print(f"\n🔍 搜索結果: '{query}'")
         print("=" * 50)
 
-        matches = []
-
-        # 普通實體搜索
-        for node in self.G.nodes():
-            # 僅搜索節點名稱
-            if query.lower() in str(node).lower():
-                matches.append(node)
+        # 普通實體搜索 (僅搜索節點名稱，使用預先轉為小寫的名稱)
+        nodes = self._csr.nodes
+        hits = np.flatnonzero(np.char.find(self._names_lower, query.lower()) >= 0)
+        matches = [nodes[j] for j in hits.tolist()]
 
         if not matches:
             print("❌ 未找到匹配的實體。")
@@ -67,20 +101,51 @@ class GraphSearcher:
         print(f"找到 {len(matches)} 個相關實體:\n")
 
         # 2. 顯示每個匹配節點的詳細信息
-        for node_name in matches:
+        if USE_LAZY_TRAVERSE and len(matches) > 1:
+            self._print_lazy(matches)
+        else:
+            for node_name in matches:
+                self._print_node_details(node_name)
+
+    def _print_lazy(self, matches):
+        """懶加載顯示: 先列出所有匹配節點的摘要，只展開用戶選擇的節點"""
+        for i, node_name in enumerate(matches, 1):
+            self._print_node_summary(node_name, index=i)
+
+        choice = self.prompt(f"顯示哪些實體的詳細信息? (1-{len(matches)}，多個用逗號分隔 / all，直接回車跳過) > ").strip().lower()
+        if not choice:
+            return
+
+        if choice == 'all':
+            selected = matches
+        else:
+            selected = []
+            for part in choice.replace('，', ',').split(','):
+                part = part.strip()
+                if part.isdigit() and 1 <= int(part) <= len(matches):
+                    selected.append(matches[int(part) - 1])
+
+        print()
+        for node_name in selected:
             self._print_node_details(node_name)
 
     def _print_node_details(self, node_name):
         """打印單個節點的詳細信息和關係"""
+        self._print_node_summary(node_name)
+        self._print_node_deep(node_name)
+
+    def _print_node_summary(self, node_name, index=None):
+        """打印節點摘要 (名稱、類型、社區大小、描述)，只使用預先建立的索引"""
         attrs = self.G.nodes[node_name]
         current_community = attrs.get('community')
 
-        print(f"📍 實體: {node_name}")
+        prefix = f"[{index}] " if index is not None else ""
+        print(f"{prefix}📍 實體: {node_name}")
         print(f"   類型: {attrs.get('group', '未知')}")
 
         # 顯示社區信息
         if current_community is not None:
-            print(f"   社區: #{current_community}")
+            print(f"   社區: #{current_community} (共 {len(self._community_members[current_community])} 個成員)")
 
         # 顯示描述
         desc = attrs.get('description', '').replace('\n', '\n         ')
@@ -89,59 +154,58 @@ class GraphSearcher:
 
         print("-" * 30)
 
+    def _print_node_deep(self, node_name):
+        """打印節點的社區關聯及全部關係 (需要遍歷鄰居和社區成員)"""
+        current_community = self.G.nodes[node_name].get('community')
+
         # --- 新增: 顯示同社區內的強關聯實體 ---
         if current_community is not None:
-            # 1. 找出同社區的所有成員
-            community_members = []
-            for node in self.G.nodes():
-                if self.G.nodes[node].get('community') == current_community:
-                    community_members.append(node)
-
-            print(f"   🏘️  所屬社區: #{current_community} (共 {len(community_members)} 個成員)")
-
-            # 2. 找出與當前節點有直接連接的同社區成員 (核心關聯)
-            community_neighbors = []
+            csr = self._csr
+            names = csr.nodes
+            i = csr.index[node_name]
 
-            # 收集所有鄰居 (不分出入)
-            all_neighbors = set(self.G.successors(node_name)) | set(self.G.predecessors(node_name))
+            # 1. 找出同社區的所有成員 (節點編號)
+            community_members = self._community_members[current_community]
 
-            for neighbor in all_neighbors:
-                neighbor_attrs = self.G.nodes[neighbor]
-                if neighbor_attrs.get('community') == current_community:
-                    # 獲取邊的權重 (取最大值如果有多條邊)
-                    weight = 0
-                    # 檢查出邊
-                    if self.G.has_edge(node_name, neighbor):
-                        weight = max(weight, self.G[node_name][neighbor].get('weight', 1))
-                    # 檢查入邊
-                    if self.G.has_edge(neighbor, node_name):
-                        weight = max(weight, self.G[neighbor][node_name].get('weight', 1))
+            # 社區大小已在摘要中顯示
+            print(f"   🏘️  所屬社區: #{current_community}")
 
-                    community_neighbors.append((neighbor, weight))
-
-            # 按權重排序
-            community_neighbors.sort(key=lambda x: x[1], reverse=True)
-
-            if community_neighbors:
+            # 2. 找出與當前節點有直接連接的同社區成員 (核心關聯)
+            # 收集所有鄰居 (不分出入)，只保留同社區的
+            neighbors, weights = csr.neighbors(i)
+            same = self._community_code[neighbors] == self._community_code[i]
+            neighbors, weights = neighbors[same], weights[same]
+
+            # 獲取邊的權重 (取最大值如果有多條邊): 按 (鄰居, 權重降序) 排序後每個鄰居取第一項
+            order = np.lexsort((-weights, neighbors))
+            neighbors, weights = neighbors[order], weights[order]
+            _, first = np.unique(neighbors, return_index=True)
+            community_neighbors = [
+                (names[j], weight) for j, weight in zip(neighbors[first].tolist(), weights[first].tolist())
+            ]
+
+            # 按權重取前 5 個 (部分排序)
+            top_neighbors = heapq.nlargest(5, community_neighbors, key=lambda x: x[1])
+
+            if top_neighbors:
                 print(f"      🔥 社區內的核心關聯 (Top 5):")
-                for neighbor, weight in community_neighbors[:5]:
+                for neighbor, weight in top_neighbors:
                     print(f"         ★ {neighbor} (強度: {weight})")
 
             # 3. 列出社區內的其他重要成員 (按度數排序，展示社區全貌)
-            # 計算社區內每個節點的度數
-            member_degrees = []
-            for member in community_members:
-                if member == node_name: continue # 跳過自己
-                degree = self.G.degree(member)
-                member_degrees.append((member, degree))
-
-            member_degrees.sort(key=lambda x: x[1], reverse=True)
+            # 計算社區內每個節點的度數 (跳過自己)
+            # 最多顯示 5 個，其中可能有 5 個已在核心關聯中出現，因此只需取度數最高的 10 個
+            others = community_members[community_members != i]
+            member_degrees = heapq.nlargest(10, zip(others.tolist(), csr.degree[others].tolist()), key=lambda x: x[1])
+            member_degrees = [(names[j], degree) for j, degree in member_degrees]
 
             print(f"      👀 社區內的其他重要成員:")
+            # 已經在核心關聯裡顯示過的成員
+            shown = {n for n, _ in top_neighbors}
             shown_count = 0
             for member, degree in member_degrees:
                 # 避免重複顯示已經在核心關聯裡顯示過的
-                if member in [n for n, w in community_neighbors[:5]]:
+                if member in shown:
                     continue
                 print(f"         • {member}")
                 shown_count += 1
@@ -152,23 +216,22 @@ class GraphSearcher:
         # 出度 (主動關係)
         out_edges = list(self.G.out_edges(node_name, data=True))
         if out_edges:
-            print("   ➡️  主動關係 (Out):")
-            for _, target, edge_attrs in out_edges:
-                rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
-                # 簡化描述顯示
-                rel_desc = rel_desc.split('\n')[0] if rel_desc else "相關"
-                weight = edge_attrs.get('weight', 1)
-                print(f"      -> {target} : {rel_desc} (強度: {weight})")
+            lines = ["   ➡️  主動關係 (Out):"]
+            lines.extend(
+                f"      -> {target} : {_relation_summary(edge_attrs)} (強度: {edge_attrs.get('weight', 1)})"
+                for _, target, edge_attrs in out_edges
+            )
+            print("\n".join(lines))
 
         # 入度 (被動關係)
         in_edges = list(self.G.in_edges(node_name, data=True))
         if in_edges:
-            print("   ⬅️  被動關係 (In):")
-            for source, _, edge_attrs in in_edges:
-                rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
-                rel_desc = rel_desc.split('\n')[0] if rel_desc else "相關"
-                weight = edge_attrs.get('weight', 1)
-                print(f"      <- {source} : {rel_desc} (強度: {weight})")
+            lines = ["   ⬅️  被動關係 (In):"]
+            lines.extend(
+                f"      <- {source} : {_relation_summary(edge_attrs)} (強度: {edge_attrs.get('weight', 1)})"
+                for source, _, edge_attrs in in_edges
+            )
+            print("\n".join(lines))
 
         print("=" * 50 + "\n")
 
@@ -181,16 +244,18 @@ def main():
     print("\n💡 提示: 輸入實體名稱進行搜索 (例如: Kiwi)")
     print("👉 輸入 'q' 或 'exit' 退出程序。\n")
 
+    session = PromptSession(history=FileHistory(SEARCH_HISTORY_FILE))
+    searcher.prompt = session.prompt
     while True:
         try:
-            user_input = input("Search > ")
+            user_input = session.prompt("Search > ")
             if user_input.lower() in ['q', 'exit', 'quit']:
                 print("👋 再見!")
                 break
 
             searcher.search(user_input)
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n👋 再見!")
             break
         except Exception as e:
@@ -8,36 +8,61 @@
 3. 顯示實體詳細信息及其關係網絡
 """
 
+import asyncio
 import json
-import networkx as nx
 import os
-from langchain_openai import ChatOpenAI
+import threading
+from collections import defaultdict
+from graph_io import GraphCSR, load_graph_file
+import heapq
+import numpy as np
 from langchain_core.messages import HumanMessage, SystemMessage
-from dotenv import load_dotenv
+from llm_client import DEEPSEEK_API_KEY, get_llm
 import re
+from concurrent.futures import ThreadPoolExecutor
+from prompt_toolkit import PromptSession
+from prompt_toolkit.history import FileHistory
+from prompt_toolkit.patch_stdout import patch_stdout
 
-# 載入 .env 檔案
-load_dotenv()
+try:
+    import ahocorasick  # 可選: pyahocorasick，多個關鍵詞一次掃描完成匹配
+except ImportError:
+    ahocorasick = None
 
-# 設定 DeepSeek API
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
-DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+# LLM 查詢分析結果的持久化緩存 (跨會話重用，超出容量時淘汰最久未使用的條目)
+QUERY_CACHE_FILE = os.path.expanduser("~/.graph_llm_cache.json")
+QUERY_CACHE_SIZE = 512
+
+# 明顯是單個實體名稱的查詢 (一個英文/數字單詞，或不超過 4 字的中文詞) 無需 LLM 分析
+_PLAIN_ENTITY_RE = re.compile(r'[A-Za-z0-9_\-]+|[\u4e00-\u9fff]{1,4}')
+
+# LLM 響應中以 ``` 代碼塊包裹的 JSON 對象
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+
+# 搜索輸入歷史 (上下鍵瀏覽，跨會話保存)
+SEARCH_HISTORY_FILE = os.path.expanduser("~/.graph_search_history")
 
 llm = None
 if DEEPSEEK_API_KEY:
-    llm = ChatOpenAI(
-        model="deepseek-chat",
-        openai_api_key=DEEPSEEK_API_KEY,
-        openai_api_base=DEEPSEEK_BASE_URL,
-        temperature=0.1
-    )
+    llm = get_llm()
 else:
     print("⚠️ Warning: DEEPSEEK_API_KEY not found. LLM features will be disabled.")
 
+def _relation_summary(edge_attrs):
+    """簡化關係描述顯示：只取第一行，無描述時顯示「相關」"""
+    rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
+    return rel_desc.split('\n', 1)[0] if rel_desc else "相關"
+
 class GraphSearcher:
     def __init__(self, json_file="graph_analysis_data.json"):
         self.json_file = json_file
         self.G = None
+        self._csr = None
+        self._community_code = None
+        self._community_members = {}
+        self._nodes_lower = []
+        self._names_lower = None
+        self._groups_lower = None
         self.load_graph()
 
     def load_graph(self):
@@ -49,11 +74,9 @@ class GraphSearcher:
 
         try:
             print(f"📂 正在加載圖譜數據: {self.json_file} ...")
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # 重建 NetworkX 圖
-            self.G = nx.node_link_graph(data)
+            # 重建 NetworkX 圖 (JSON 未更新時直接載入 pickle 緩存)
+            self.G = load_graph_file(self.json_file)
+            self._build_index()
             print(f"✅ 圖譜加載成功!")
             print(f"   - 節點數: {self.G.number_of_nodes()}")
             print(f"   - 邊數: {self.G.number_of_edges()}")
@@ -62,8 +85,63 @@ class GraphSearcher:
             print(f"❌ 加載失敗: {e}")
             return False
 
-    def search(self, query, entity_type=None):
-        """搜索節點並顯示相關信息"""
+    def _build_index(self):
+        """預先建立 社區 -> 成員、節點 -> 度數 及小寫名稱/類型索引，避免每次查詢都掃描全圖"""
+        self._csr = GraphCSR(self.G)
+
+        # 社區 -> 成員節點編號數組，以及每個節點所屬社區的整數編碼
+        members = defaultdict(list)
+        codes = {}
+        community_code = []
+        for i, (node, attrs) in enumerate(self.G.nodes(data=True)):
+            community = attrs.get('community')
+            members[community].append(i)
+            community_code.append(codes.setdefault(community, len(codes)))
+        self._community_members = {c: np.array(ids, dtype=np.int64) for c, ids in members.items()}
+        self._community_code = np.array(community_code, dtype=np.int64)
+
+        self._nodes_lower = [
+            (node, str(node).lower(), str(attrs.get('group', '')).lower())
+            for node, attrs in self.G.nodes(data=True)
+        ]
+        # 同樣的小寫名稱/類型打包為 NumPy 字符串數組，子字串匹配以 np.char.find 在 C 層逐元素完成
+        self._names_lower = np.array([name for _, name, _ in self._nodes_lower], dtype=str)
+        self._groups_lower = np.array([group for _, _, group in self._nodes_lower], dtype=str)
+
+    def find_name_matches(self, queries):
+        """一次遍歷所有節點名稱，找出包含各個關鍵詞的節點
+
+        安裝了 pyahocorasick 時以 Aho–Corasick 自動機對每個名稱只掃描一次，
+        否則逐個關鍵詞以 np.char.find 對整個名稱數組做向量化子字串匹配。
+
+        Returns:
+            dict: {關鍵詞(小寫): [匹配節點]}，節點按圖中順序排列
+        """
+        patterns = {q.strip().lower() for q in queries if q and q.strip()}
+        matches = {pattern: [] for pattern in patterns}
+        if not patterns:
+            return matches
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for pattern in patterns:
+                automaton.add_word(pattern, pattern)
+            automaton.make_automaton()
+            for node, node_lower, _ in self._nodes_lower:
+                for pattern in {pattern for _, pattern in automaton.iter(node_lower)}:
+                    matches[pattern].append(node)
+        else:
+            nodes = self._csr.nodes
+            for pattern in patterns:
+                hits = np.flatnonzero(np.char.find(self._names_lower, pattern) >= 0)
+                matches[pattern] = [nodes[j] for j in hits.tolist()]
+        return matches
+
+    def search(self, query, entity_type=None, name_matches=None):
+        """搜索節點並顯示相關信息
+
+        name_matches 為 find_name_matches 預先找到的名稱匹配節點，未提供時在此計算。
+        """
         if not self.G:
             return False
 
@@ -74,28 +152,30 @@ class GraphSearcher:
         print(f"\n🔍 搜索結果: '{query}' (類型: {entity_type})")
         print("=" * 50)
 
-        matches_name = []
-        matches_type = []
-
-        # 遍歷所有節點
-        for node, attrs in self.G.nodes(data=True):
-            node_name = str(node)
-            node_group = str(attrs.get('group', ''))
-
-            # 1. 名稱匹配
-            if query.lower() in node_name.lower():
-                # 修正: 先找到名稱, 然後只保留相關type
-                if entity_type and entity_type != "Unknown":
-                    if entity_type.lower() in node_group.lower() or node_group.lower() in entity_type.lower():
-                        matches_name.append(node)
-                else:
+        query_lower = query.lower()
+        if name_matches is None:
+            name_matches = self.find_name_matches([query])[query_lower]
+
+        # 1. 名稱匹配
+        # 修正: 先找到名稱, 然後只保留相關type
+        if entity_type and entity_type != "Unknown":
+            type_lower = entity_type.lower()
+            matches_name = []
+            for node in name_matches:
+                node_group = str(self.G.nodes[node].get('group', '')).lower()
+                if type_lower in node_group or node_group in type_lower:
                     matches_name.append(node)
-
-            # 2. 類型匹配 (檢查 query 是否為類型)
-            # 情況 A: 用戶搜 "零食"，圖中有 group="零食" 的節點
-            if query.lower() in node_group.lower():
-                if node not in matches_name and node not in matches_type:
-                    matches_type.append(node)
+        else:
+            matches_name = list(name_matches)
+
+        # 2. 類型匹配 (檢查 query 是否為類型)
+        # 情況 A: 用戶搜 "零食"，圖中有 group="零食" 的節點
+        name_set = set(matches_name)
+        nodes = self._csr.nodes
+        matches_type = [
+            nodes[j] for j in np.flatnonzero(np.char.find(self._groups_lower, query_lower) >= 0).tolist()
+            if nodes[j] not in name_set
+        ]
 
         if not matches_name and not matches_type:
             print(f"❌ 未找到匹配的實體: {query}")
@@ -124,6 +204,11 @@ class GraphSearcher:
 
     def _print_node_details(self, node_name):
         """打印單個節點的詳細信息和關係"""
+        self._print_node_summary(node_name)
+        self._print_node_deep(node_name)
+
+    def _print_node_summary(self, node_name):
+        """打印節點摘要 (名稱、類型、社區大小、描述)，只使用預先建立的索引"""
         attrs = self.G.nodes[node_name]
         current_community = attrs.get('community')
 
@@ -132,7 +217,7 @@ class GraphSearcher:
 
         # 顯示社區信息
         if current_community is not None:
-            print(f"   社區: #{current_community}")
+            print(f"   社區: #{current_community} (共 {len(self._community_members[current_community])} 個成員)")
 
         # 顯示描述
         desc = attrs.get('description', '').replace('\n', '\n         ')
@@ -141,59 +226,58 @@ class GraphSearcher:
 
         print("-" * 30)
 
+    def _print_node_deep(self, node_name):
+        """打印節點的社區關聯及全部關係 (需要遍歷鄰居和社區成員)"""
+        current_community = self.G.nodes[node_name].get('community')
+
         # --- 新增: 顯示同社區內的強關聯實體 ---
         if current_community is not None:
-            # 1. 找出同社區的所有成員
-            community_members = []
-            for node in self.G.nodes():
-                if self.G.nodes[node].get('community') == current_community:
-                    community_members.append(node)
+            csr = self._csr
+            names = csr.nodes
+            i = csr.index[node_name]
 
-            print(f"   🏘️  所屬社區: #{current_community} (共 {len(community_members)} 個成員)")
+            # 1. 找出同社區的所有成員 (節點編號)
+            community_members = self._community_members[current_community]
 
-            # 2. 找出與當前節點有直接連接的同社區成員 (核心關聯)
-            community_neighbors = []
-
-            # 收集所有鄰居 (不分出入)
-            all_neighbors = set(self.G.successors(node_name)) | set(self.G.predecessors(node_name))
-
-            for neighbor in all_neighbors:
-                neighbor_attrs = self.G.nodes[neighbor]
-                if neighbor_attrs.get('community') == current_community:
-                    # 獲取邊的權重 (取最大值如果有多條邊)
-                    weight = 0
-                    # 檢查出邊
-                    if self.G.has_edge(node_name, neighbor):
-                        weight = max(weight, self.G[node_name][neighbor].get('weight', 1))
-                    # 檢查入邊
-                    if self.G.has_edge(neighbor, node_name):
-                        weight = max(weight, self.G[neighbor][node_name].get('weight', 1))
+            # 社區大小已在摘要中顯示
+            print(f"   🏘️  所屬社區: #{current_community}")
 
-                    community_neighbors.append((neighbor, weight))
-
-            # 按權重排序
-            community_neighbors.sort(key=lambda x: x[1], reverse=True)
-
-            if community_neighbors:
+            # 2. 找出與當前節點有直接連接的同社區成員 (核心關聯)
+            # 收集所有鄰居 (不分出入)，只保留同社區的
+            neighbors, weights = csr.neighbors(i)
+            same = self._community_code[neighbors] == self._community_code[i]
+            neighbors, weights = neighbors[same], weights[same]
+
+            # 獲取邊的權重 (取最大值如果有多條邊): 按 (鄰居, 權重降序) 排序後每個鄰居取第一項
+            order = np.lexsort((-weights, neighbors))
+            neighbors, weights = neighbors[order], weights[order]
+            _, first = np.unique(neighbors, return_index=True)
+            community_neighbors = [
+                (names[j], weight) for j, weight in zip(neighbors[first].tolist(), weights[first].tolist())
+            ]
+
+            # 按權重取前 5 個 (部分排序)
+            top_neighbors = heapq.nlargest(5, community_neighbors, key=lambda x: x[1])
+
+            if top_neighbors:
                 print(f"      🔥 社區內的核心關聯 (Top 5):")
-                for neighbor, weight in community_neighbors[:5]:
+                for neighbor, weight in top_neighbors:
                     print(f"         ★ {neighbor} (強度: {weight})")
 
             # 3. 列出社區內的其他重要成員 (按度數排序，展示社區全貌)
-            # 計算社區內每個節點的度數
-            member_degrees = []
-            for member in community_members:
-                if member == node_name: continue # 跳過自己
-                degree = self.G.degree(member)
-                member_degrees.append((member, degree))
-
-            member_degrees.sort(key=lambda x: x[1], reverse=True)
+            # 計算社區內每個節點的度數 (跳過自己)
+            # 最多顯示 5 個，其中可能有 5 個已在核心關聯中出現，因此只需取度數最高的 10 個
+            others = community_members[community_members != i]
+            member_degrees = heapq.nlargest(10, zip(others.tolist(), csr.degree[others].tolist()), key=lambda x: x[1])
+            member_degrees = [(names[j], degree) for j, degree in member_degrees]
 
             print(f"      👀 社區內的其他重要成員:")
+            # 已經在核心關聯裡顯示過的成員
+            shown = {n for n, _ in top_neighbors}
             shown_count = 0
             for member, degree in member_degrees:
                 # 避免重複顯示已經在核心關聯裡顯示過的
-                if member in [n for n, w in community_neighbors[:5]]:
+                if member in shown:
                     continue
                 print(f"         • {member}")
                 shown_count += 1
@@ -204,32 +288,124 @@ class GraphSearcher:
         # 出度 (主動關係)
         out_edges = list(self.G.out_edges(node_name, data=True))
         if out_edges:
-            print("   ➡️  主動關係 (Out):")
-            for _, target, edge_attrs in out_edges:
-                rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
-                # 簡化描述顯示
-                rel_desc = rel_desc.split('\n')[0] if rel_desc else "相關"
-                weight = edge_attrs.get('weight', 1)
-                print(f"      -> {target} : {rel_desc} (強度: {weight})")
+            lines = ["   ➡️  主動關係 (Out):"]
+            lines.extend(
+                f"      -> {target} : {_relation_summary(edge_attrs)} (強度: {edge_attrs.get('weight', 1)})"
+                for _, target, edge_attrs in out_edges
+            )
+            print("\n".join(lines))
 
         # 入度 (被動關係)
         in_edges = list(self.G.in_edges(node_name, data=True))
         if in_edges:
-            print("   ⬅️  被動關係 (In):")
-            for source, _, edge_attrs in in_edges:
-                rel_desc = edge_attrs.get('description', edge_attrs.get('label', '相關'))
-                rel_desc = rel_desc.split('\n')[0] if rel_desc else "相關"
-                weight = edge_attrs.get('weight', 1)
-                print(f"      <- {source} : {rel_desc} (強度: {weight})")
+            lines = ["   ⬅️  被動關係 (In):"]
+            lines.extend(
+                f"      <- {source} : {_relation_summary(edge_attrs)} (強度: {edge_attrs.get('weight', 1)})"
+                for source, _, edge_attrs in in_edges
+            )
+            print("\n".join(lines))
 
         print("=" * 50 + "\n")
 
-def analyze_query_with_llm(query):
-    """使用 LLM 分析用戶查詢，提取關鍵詞"""
-    if not llm:
-        return [{"entity_name": query, "entity_type": "Unknown"}]
+def _extract_json_block(text):
+    """單次掃描提取第一個完整的 JSON 對象
+
+    以狀態機計數花括號深度 (跳過字符串內的括號與轉義字符)，
+    深度從 0 變為 1 時記錄起點，回到 0 時即返回，不依賴回溯式正則。
+    未找到完整對象時返回 None。
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0
+        elif ch == '{':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+def _load_query_cache():
+    """讀取上次會話保存的查詢分析緩存"""
+    try:
+        with open(QUERY_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+_query_cache = _load_query_cache()
+# 多批查詢可能同時在後台線程中分析，緩存的讀寫需加鎖
+_query_cache_lock = threading.Lock()
+
+def _save_query_cache():
+    """保存查詢分析緩存，只保留最近使用的 QUERY_CACHE_SIZE 條"""
+    while len(_query_cache) > QUERY_CACHE_SIZE:
+        del _query_cache[next(iter(_query_cache))]
+    try:
+        with open(QUERY_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(_query_cache, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"⚠️ 無法保存查詢緩存: {e}")
 
-    system_prompt = """你是一個知識圖譜搜索助手。你的任務是分析用戶的自然語言問題，提取出可能存在於圖譜中的關鍵實體名稱及其類型。
+class _EntityStreamParser:
+    """增量解析流式 JSON 響應，每當一個實體對象完整到達時立即返回它
+
+    與 _extract_json_block 相同的花括號深度狀態機，跨數據塊保存狀態；
+    實體對象即 {"entities": [{...}, ...]} 中第二層的 {...}。
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.depth = 0
+        self.start = -1
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk):
+        """追加一個數據塊，返回本次新完成的實體列表"""
+        entities = []
+        offset = len(self.text)
+        self.text += chunk
+        for i, ch in enumerate(chunk, offset):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch == '{':
+                self.depth += 1
+                if self.depth == 2:
+                    self.start = i
+            elif ch == '}' and self.depth:
+                if self.depth == 2:
+                    try:
+                        entity = json.loads(self.text[self.start:i + 1])
+                    except ValueError:
+                        entity = None
+                    if isinstance(entity, dict) and 'entity_name' in entity:
+                        entities.append(entity)
+                self.depth -= 1
+        return entities
+
+QUERY_SYSTEM_PROMPT = """你是一個知識圖譜搜索助手。你的任務是分析用戶的自然語言問題，提取出可能存在於圖譜中的關鍵實體名稱及其類型。
 
     請輸出一個 JSON 對象，格式如下：
     {
@@ -247,68 +423,191 @@ def analyze_query_with_llm(query):
     3. 只返回 JSON，不要包含其他文本。
     """
 
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=query)
+# 一批問題中同時發送給 DeepSeek 的最大請求數
+QUERY_MAX_CONCURRENCY = 8
+
+def _parse_entities(query, content):
+    """從 LLM 響應文本中解析實體列表"""
+    content = content.strip()
+
+    # 嘗試解析 JSON
+    match = _JSON_BLOCK_RE.search(content)
+    if match:
+        content = match.group(1)
+    else:
+        content = _extract_json_block(content) or content
+
+    data = json.loads(content)
+    return data.get("entities", [{"entity_name": query, "entity_type": "Unknown"}])
+
+def _stream_query(index, query, on_entity):
+    """以流式方式分析單個查詢，每解析出一個完整實體就調用 on_entity(index, entity)"""
+    messages = [SystemMessage(content=QUERY_SYSTEM_PROMPT), HumanMessage(content=query)]
+    parser = _EntityStreamParser()
+    chunks = []
+    for chunk in llm.stream(messages):
+        chunks.append(chunk.content)
+        if on_entity:
+            for entity in parser.feed(chunk.content):
+                on_entity(index, entity)
+    return "".join(chunks)
+
+def analyze_query_with_llm(queries, on_entity=None):
+    """使用 LLM 分析一批用戶查詢，提取關鍵詞
+
+    簡單的實體名稱直接作為關鍵詞返回；分析過的查詢從緩存中返回，均不調用 LLM。
+    其餘查詢在線程池中併發地以流式方式發送，共享逐字節相同的系統提示詞前綴；
+    提供 on_entity 時，每個實體一經生成即回調 on_entity(查詢序號, 實體)，無需等待完整響應。
+
+    Returns:
+        list: 與 queries 一一對應的實體列表
+    """
+    results = [None] * len(queries)
+    pending = []
+
+    for i, query in enumerate(queries):
+        if not llm or _PLAIN_ENTITY_RE.fullmatch(query.strip()):
+            results[i] = [{"entity_name": query, "entity_type": "Unknown"}]
+            continue
+        with _query_cache_lock:
+            if query in _query_cache:
+                # 重新插入到末尾，標記為最近使用
+                _query_cache[query] = _query_cache.pop(query)
+                results[i] = _query_cache[query]
+                continue
+        pending.append(i)
+
+    if not pending:
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(QUERY_MAX_CONCURRENCY, len(pending))) as executor:
+        futures = [executor.submit(_stream_query, i, queries[i], on_entity) for i in pending]
+
+        for i, future in zip(pending, futures):
+            query = queries[i]
+            try:
+                entities = _parse_entities(query, future.result())
+                with _query_cache_lock:
+                    _query_cache[query] = entities
+                results[i] = entities
+            except Exception as e:
+                print(f"⚠️ LLM 分析失敗，將使用原始查詢: {e}")
+                results[i] = [{"entity_name": query, "entity_type": "Unknown"}]
+
+    with _query_cache_lock:
+        _save_query_cache()
+    return results
+
+def search_entities(searcher, entities, prefetched=()):
+    """在圖譜中搜索 LLM 提取出的所有實體
+
+    prefetched 為流式響應期間已提交的名稱匹配任務 (find_name_matches 的 Future)。
+    """
+    print(f"🔍 提取實體: {json.dumps(entities, ensure_ascii=False)}")
+
+    # 合併預先完成的名稱匹配，其餘關鍵詞一次完成匹配
+    name_matches = {}
+    for future in prefetched:
+        name_matches.update(future.result())
+    missing = [
+        entity.get('entity_name') for entity in entities
+        if (entity.get('entity_name') or '').strip().lower() not in name_matches
     ]
+    if missing:
+        name_matches.update(searcher.find_name_matches(missing))
 
-    try:
-        response = llm.invoke(messages)
-        content = response.content.strip()
-
-        # 嘗試解析 JSON
-        match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, re.DOTALL)
-        if match:
-            content = match.group(1)
-        elif '{' in content:
-             # 簡單的提取
-             start = content.find('{')
-             end = content.rfind('}') + 1
-             content = content[start:end]
-
-        data = json.loads(content)
-        return data.get("entities", [{"entity_name": query, "entity_type": "Unknown"}])
-    except Exception as e:
-        print(f"⚠️ LLM 分析失敗，將使用原始查詢: {e}")
-        return [{"entity_name": query, "entity_type": "Unknown"}]
+    found_count = 0
+    for entity in entities:
+        name = entity.get('entity_name')
+        etype = entity.get('entity_type')
+        print(f"\n--- 搜索: {name} ({etype}) ---")
+        if searcher.search(name, etype, name_matches.get((name or '').strip().lower())):
+            found_count += 1
 
-def main():
+    if found_count == 0:
+        print("❌ 所有關鍵詞均未找到匹配實體。")
+
+async def read_queries(session):
+    """讀取一批問題：每行一個，輸入空行提交
+
+    Returns:
+        list: 問題列表；首行輸入 'q' / 'exit' / 'quit' 時返回 None
+    """
+    queries = []
+    while True:
+        prompt = "Search (輸入問題或實體) > " if not queries else "   ... (繼續輸入，空行提交) > "
+        line = (await session.prompt_async(prompt)).strip()
+        if not queries and line.lower() in ['q', 'exit', 'quit']:
+            return None
+        if not line:
+            return queries
+        queries.append(line)
+
+def render_results(searcher, queries, all_entities, prefetched):
+    """按問題順序顯示一批查詢的搜索結果"""
+    for i, (user_input, entities) in enumerate(zip(queries, all_entities)):
+        if len(queries) > 1:
+            print(f"\n❓ 問題: {user_input}")
+        search_entities(searcher, entities, prefetched[i])
+
+async def render_in_order(searcher, jobs):
+    """按提交順序等待每批問題的分析結果並顯示，不阻塞輸入框"""
+    while True:
+        queries, analysis, prefetched = await jobs.get()
+        try:
+            render_results(searcher, queries, await analysis, prefetched)
+        except Exception as e:
+            print(f"發生錯誤: {e}")
+        finally:
+            jobs.task_done()
+
+async def async_main():
     searcher = GraphSearcher()
 
     if not searcher.G:
         return
 
     print("\n💡 提示: 輸入實體名稱或自然語言問題進行搜索")
+    print("👉 可連續輸入多個問題 (每行一個)，輸入空行後一起分析；分析期間可繼續輸入下一批")
     print("👉 輸入 'q' 或 'exit' 退出程序。\n")
 
-    while True:
-        try:
-            user_input = input("Search (輸入問題或實體) > ")
-            if user_input.lower() in ['q', 'exit', 'quit']:
-                print("👋 再見!")
+    session = PromptSession(history=FileHistory(SEARCH_HISTORY_FILE))
+    loop = asyncio.get_running_loop()
+    jobs = asyncio.Queue()
+    renderer = asyncio.create_task(render_in_order(searcher, jobs))
+
+    with patch_stdout(), ThreadPoolExecutor(max_workers=QUERY_MAX_CONCURRENCY) as search_pool:
+        while True:
+            try:
+                queries = await read_queries(session)
+            except (EOFError, KeyboardInterrupt):
                 break
+            if queries is None:
+                break
+            if not queries:
+                continue
 
-            # 使用 LLM 分析
+            # 在後台線程中分析 (整批問題一起發送)，輸入框立即返回
             print("🤖 正在分析問題...")
-            entities = analyze_query_with_llm(user_input)
-            print(f"🔍 提取實體: {json.dumps(entities, ensure_ascii=False)}")
+            # 每個實體一經生成就在後台開始名稱匹配，與 LLM 生成重疊進行
+            prefetched = defaultdict(list)
 
-            found_count = 0
-            for entity in entities:
+            def on_entity(index, entity, prefetched=prefetched):
                 name = entity.get('entity_name')
-                etype = entity.get('entity_type')
-                print(f"\n--- 搜索: {name} ({etype}) ---")
-                if searcher.search(name, etype):
-                    found_count += 1
+                print(f"   ⇢ 已識別實體: {name} ({entity.get('entity_type')})")
+                prefetched[index].append(search_pool.submit(searcher.find_name_matches, [name]))
 
-            if found_count == 0:
-                print("❌ 所有關鍵詞均未找到匹配實體。")
+            analysis = loop.run_in_executor(None, analyze_query_with_llm, queries, on_entity)
+            await jobs.put((queries, analysis, prefetched))
 
-        except KeyboardInterrupt:
-            print("\n👋 再見!")
-            break
-        except Exception as e:
-            print(f"發生錯誤: {e}")
+        # 顯示完已提交的問題再退出
+        await jobs.join()
+        renderer.cancel()
+
+    print("👋 再見!")
+
+def main():
+    asyncio.run(async_main())
 
 if __name__ == "__main__":
     main()
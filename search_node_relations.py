@@ -1,11 +1,18 @@
-import json
-import networkx as nx
 import os
+from graph_io import load_graph_file
+import numpy as np
+from prompt_toolkit import PromptSession
+from prompt_toolkit.history import FileHistory
+
+# 搜索輸入歷史 (上下鍵瀏覽，跨會話保存)
+SEARCH_HISTORY_FILE = os.path.expanduser("~/.graph_search_history")
 
 class GraphRelationExplorer:
     def __init__(self, json_file="graph_analysis_data.json"):
         self.json_file = json_file
         self.G = None
+        self._nodes = []
+        self._names_lower = None
         self.load_graph()
 
     def load_graph(self):
@@ -15,9 +22,10 @@ class GraphRelationExplorer:
             return
 
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            self.G = nx.node_link_graph(data)
+            self.G = load_graph_file(self.json_file)
+            # 小寫節點名稱打包為 NumPy 字符串數組，子字串匹配以 np.char.find 在 C 層逐元素完成
+            self._nodes = list(self.G.nodes())
+            self._names_lower = np.array([str(node).lower() for node in self._nodes], dtype=str)
             print(f"✅ 圖譜加載成功! 節點數: {self.G.number_of_nodes()}, 邊數: {self.G.number_of_edges()}")
         except Exception as e:
             print(f"❌ 加載失敗: {e}")
@@ -29,11 +37,9 @@ class GraphRelationExplorer:
 
         print(f"\n🔍 正在搜索包含 '{query}' 的節點...\n")
 
-        found_nodes = []
-        for node, attrs in self.G.nodes(data=True):
-            # 簡單的子字串匹配，忽略大小寫
-            if query.lower() in str(node).lower():
-                found_nodes.append(node)
+        # 簡單的子字串匹配，忽略大小寫
+        hits = np.flatnonzero(np.char.find(self._names_lower, query.lower()) >= 0)
+        found_nodes = [self._nodes[j] for j in hits.tolist()]
 
         if not found_nodes:
             print(f"❌ 未找到包含 '{query}' 的節點")
@@ -88,15 +94,16 @@ def main():
 
     print("💡 提示: 輸入關鍵詞搜索節點及其關係")
 
+    session = PromptSession(history=FileHistory(SEARCH_HISTORY_FILE))
     while True:
         try:
-            query = input("\n請輸入搜索關鍵詞 (輸入 'q' 退出): ").strip()
+            query = session.prompt("\n請輸入搜索關鍵詞 (輸入 'q' 退出): ").strip()
             if query.lower() in ['q', 'exit', 'quit']:
                 break
 
             if query:
                 explorer.search_similar_nodes(query)
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             break
         except Exception as e:
             print(f"發生錯誤: {e}")
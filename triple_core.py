@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+三元組抽取共用模塊
+功能：
+1. 讀取 messages.json / summary.json 並準備待抽取的文本
+2. 併發調用 DeepSeek 提取三元組（帶本地響應緩存）
+3. 解析響應並保存為 triples_comparison_categorized.txt / .json
+
+各入口腳本只需提供自己的系統提示詞並調用 main(system_prompt)。
+"""
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from llm_client import DEEPSEEK_MODEL, get_llm
+import asyncio
+import hashlib
+import itertools
+import json
+import ijson
+import orjson
+import os
+
+# JSON 模式: 服務端保證輸出為合法的 JSON 對象，無需從前後文中提取或修復
+# (要求系統提示詞中提及 JSON，兩個入口腳本的提示詞均已滿足)
+RESPONSE_FORMAT = {"type": "json_object"}
+
+# 在共享的 DeepSeek 實例上綁定 JSON 模式 (驗證 API Key，未設置時拋出 ValueError)
+llm = get_llm().bind(response_format=RESPONSE_FORMAT)
+
+# 本地響應緩存目錄 (相同的模型與提示詞直接重用上次的響應)
+CACHE_DIR = "cache"
+
+# 同時發送給 DeepSeek 的最大請求數
+MAX_CONCURRENCY = 10
+
+# 用戶消息模板 ({text} 為待分析的內容)
+HUMAN_TEMPLATE = "請分析以下內容，提取三元組並輸出為JSON格式：\n\n{text}"
+
+
+def dedup_messages(messages):
+    """跳過內容完全相同的重複消息 (保留首次出現)，減少發送給 LLM 的 token"""
+    seen = set()
+    for msg in messages:
+        content = msg["content"]
+        if content in seen:
+            continue
+        seen.add(content)
+        yield msg
+
+
+def format_conversation(messages):
+    """將對話記錄格式化為每行 "User: ..." / "Assistant: ..." 的文本"""
+    return "\n".join(
+        f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
+        for msg in messages
+    )
+
+
+def build_prompt(system_prompt):
+    """構建三元組抽取的提示詞模板
+
+    系統提示詞以 SystemMessage 原樣放入 (其中的 JSON 示例含有花括號，不能作為模板解析)，
+    所有請求共享逐字節相同的前綴，便於 DeepSeek 服務端的前綴緩存命中。
+    """
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=system_prompt),
+        ("human", HUMAN_TEMPLATE)
+    ])
+
+
+def _cache_path(system_prompt, text):
+    """以 SHA-256(模型, 輸出格式, 系統提示詞, 用戶內容) 作為緩存鍵，返回緩存文件路徑"""
+    key_source = "\0".join([DEEPSEEK_MODEL, RESPONSE_FORMAT["type"], system_prompt, HUMAN_TEMPLATE.format(text=text)])
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def _read_cache(path):
+    """讀取緩存的響應文本，未命中或緩存的響應無法解析時返回 None (重新請求)"""
+    try:
+        with open(path, "rb") as f:
+            content = orjson.loads(f.read())["content"]
+    except (FileNotFoundError, orjson.JSONDecodeError, KeyError):
+        return None
+    return content if parse_json_response(content) is not None else None
+
+
+def _write_cache(path, content):
+    """將響應文本寫入緩存"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(orjson.dumps({"content": content}))
+
+
+async def _stream_response(index, chain, text, semaphore):
+    """以流式方式接收單個響應，逐塊累積為完整文本"""
+    async with semaphore:
+        chunks = []
+        async for chunk in chain.astream({"text": text}):
+            chunks.append(chunk.content)
+    content = "".join(chunks)
+    print(f"  ⇣ 已接收第 {index + 1} 個響應 ({len(content)} 字)")
+    return content
+
+
+async def extract_triples_from_texts(system_prompt, texts):
+    """在同一事件循環上併發地以流式方式從多段文本中提取三元組，已緩存的請求不再調用 LLM
+
+    Returns:
+        list: 與 texts 一一對應的響應文本，請求失敗的項目為對應的 Exception
+    """
+    cache_paths = [_cache_path(system_prompt, text) for text in texts]
+    contents = [_read_cache(path) for path in cache_paths]
+
+    misses = [i for i, content in enumerate(contents) if content is None]
+    if len(misses) < len(texts):
+        print(f"  ♻ 命中緩存 {len(texts) - len(misses)} 個請求")
+
+    if misses:
+        chain = build_prompt(system_prompt) | llm
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        responses = await asyncio.gather(
+            *(_stream_response(i, chain, texts[i], semaphore) for i in misses),
+            return_exceptions=True
+        )
+        for i, response in zip(misses, responses):
+            contents[i] = response
+            # 只緩存可解析的響應，截斷或無效的響應下次運行時重新請求
+            if not isinstance(response, Exception) and parse_json_response(response) is not None:
+                _write_cache(cache_paths[i], response)
+
+    return contents
+
+
+def parse_json_response(response_text):
+    """解析LLM的JSON響應 (JSON 模式下響應本身即為合法 JSON)"""
+    try:
+        return orjson.loads(response_text)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _iter_triples(triples):
+    """將三元組統一為 (序號, 主體, 關係, 客體, 類別) 元組
+
+    逐項判斷格式 (同一事件中可混合兩種格式)：
+    數組格式 [subject, relation, object, category] 或字典格式 {"subject": ..., ...}。
+    兩者都不符合的項目被跳過，但仍佔用序號。
+    """
+    for i, triple in enumerate(triples, 1):
+        if isinstance(triple, list) and len(triple) >= 4:
+            # 數組格式: [subject, relation, object, category]
+            yield i, triple[0], triple[1], triple[2], triple[3]
+        elif isinstance(triple, dict):
+            # 字典格式: {"subject": ..., "relation": ..., ...}
+            yield (i, triple.get('subject', ''), triple.get('relation', ''),
+                   triple.get('object', ''), triple.get('category', '行為'))
+
+
+def iter_text_lines(data):
+    """將JSON格式逐行轉換為文本格式 (生成器，調用方可直接流式寫出)"""
+    # 新格式處理 (entities & relationships)
+    if 'entities' in data or 'relationships' in data:
+        if 'entities' in data:
+            yield "【實體】"
+            for e in data['entities']:
+                name = e.get('entity_name', 'Unknown')
+                etype = e.get('entity_type', 'Unknown')
+                desc = e.get('entity_description', '')
+                yield f"[{etype}] {name}: {desc}"
+
+        if 'relationships' in data:
+            if 'entities' in data:
+                yield ""
+            yield "【關係】"
+            for r in data['relationships']:
+                src = r.get('source_entity', '')
+                tgt = r.get('target_entity', '')
+                desc = r.get('relationship_description', '')
+                strength = r.get('relationship_strength', '')
+                yield f"({src} -> {tgt}) [{strength}] {desc}"
+
+        return
+
+    # 舊格式處理 (events)
+    if not isinstance(data, dict) or 'events' not in data:
+        return
+
+    for event in data['events']:
+        event_id = event.get('event_id', 'E1')
+        event_name = event.get('event_name', '')
+
+        # 主事件
+        subjects = event.get('main_subjects', [])
+        if subjects:
+            main_subject = '和'.join(subjects)
+            yield f"[{event_id}][事件] ({main_subject}, 進行, {event_name})"
+
+        # 子三元組
+        yield from (
+            f"[{event_id}.{i}][{category}] ({subject}, {relation}, {obj})"
+            for i, subject, relation, obj, category in _iter_triples(event.get('triples', []))
+        )
+
+
+def convert_json_to_text_format(data):
+    """將JSON格式轉換為文本格式"""
+    return "\n".join(iter_text_lines(data))
+
+
+def process_json_file(file_path, source_name, is_conversation=False, max_batches=None):
+    """讀取JSON文件並準備待抽取的文本
+
+    Args:
+        file_path: JSON文件路徑
+        source_name: 數據源名稱
+        is_conversation: 是否為對話格式（messages.json）
+        max_batches: 最多處理的對話批次數，None 表示處理全部
+
+    Returns:
+        list: [(批次標籤, 文本), ...]
+    """
+    try:
+        prompts = []
+
+        # 準備文本內容
+        if is_conversation:
+            # messages.json: 流式讀取並去重，每 20 句對話分批處理，不必整個文件載入內存
+            batch_size = 20
+            batches = []
+
+            with open(file_path, "rb") as f:
+                messages = dedup_messages(ijson.items(f, "item"))
+                start_idx = 0
+                while max_batches is None or len(batches) < max_batches:
+                    batch_messages = list(itertools.islice(messages, batch_size))
+                    if not batch_messages:
+                        break
+
+                    text_content = format_conversation(batch_messages)
+
+                    end_idx = start_idx + len(batch_messages)
+                    batches.append((start_idx, end_idx, text_content))
+                    start_idx = end_idx
+
+            num_batches = len(batches)
+            print(f"\n正在準備 {source_name}，共 {start_idx} 條不重複消息，分 {num_batches} 批次...")
+
+            for batch_idx, (start_idx, end_idx, text_content) in enumerate(batches):
+                label = f"{source_name} 批次 {batch_idx + 1}/{num_batches} (第 {start_idx + 1}-{end_idx} 條消息)"
+                prompts.append((label, text_content))
+
+        else:
+            # summary.json: 取 summary 欄位（不分批）
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            text_content = data.get("summary", "")
+            prompts.append((source_name, text_content))
+
+        return prompts
+
+    except FileNotFoundError:
+        print(f"錯誤：找不到 {file_path}")
+        return []
+    except Exception as e:
+        print(f"錯誤：{e}")
+        return []
+
+
+async def main(system_prompt, single_batch=False):
+    """交互式選擇數據源，提取三元組並保存結果
+
+    Args:
+        system_prompt: 三元組抽取使用的系統提示詞
+        single_batch: 只處理前 20 句對話，且每個數據源只保存單個結果對象
+            (而非列表)，即 visualize.py 讀取的格式；metadata.sources 記錄文件名 (如 messages.json)
+    """
+    max_batches = 1 if single_batch else None
+
+    # 選擇要處理的數據源
+    print("請選擇要提取三元組的數據源：")
+    print("1. messages.json (對話記錄)")
+    print("2. summary.json (摘要)")
+    print("3. 兩者都提取")
+
+    choice = input("請輸入選擇 (1/2/3): ").strip()
+
+    # 先準備所有待抽取的文本: (結果鍵, 批次標籤, 文本)
+    prompts = []
+
+    if choice in ["1", "3"]:
+        for label, text in process_json_file(
+            "messages.json", "messages.json", is_conversation=True, max_batches=max_batches
+        ):
+            prompts.append(("messages", label, text))
+
+    if choice in ["2", "3"]:
+        for label, text in process_json_file("summary.json", "summary.json", is_conversation=False):
+            prompts.append(("summary", label, text))
+
+    # 一次性併發發送所有批次的請求
+    responses = []
+    if prompts:
+        print(f"\n正在併發提取 {len(prompts)} 個請求的三元組 (最大併發數 {MAX_CONCURRENCY})...")
+        responses = await extract_triples_from_texts(system_prompt, [text for _, _, text in prompts])
+
+    results = {}
+    for (key, label, _), response in zip(prompts, responses):
+        if isinstance(response, Exception):
+            print(f"  ⚠ {label} 請求失敗：{response}")
+            continue
+        print(response)
+
+        # 解析JSON
+        parsed_json = parse_json_response(response)
+        if parsed_json:
+            results.setdefault(key, []).append(parsed_json)
+            print(f"  ✓ {label} 提取完成")
+        else:
+            print(f"  ⚠ 無法解析 {label} 的響應")
+
+    # 儲存結果
+
+    # 保存文本格式: 逐行直接寫入文件，不在內存中拼接完整的輸出文本
+    # (同一數據源的結果之間換行，不同數據源之間空一行)
+    with open("triples_comparison_categorized.txt", "w", encoding="utf-8") as f:
+        separator = None
+        for parsed_jsons in results.values():
+            for parsed_json in parsed_jsons:
+                for line in iter_text_lines(parsed_json):
+                    if separator is not None:
+                        f.write(separator)
+                    f.write(line)
+                    separator = "\n"
+            if separator is not None:
+                separator = "\n\n"
+
+    # metadata.sources 沿用各腳本原有的格式: 單批次模式 (langchain_triple.py) 記錄文件名，否則記錄結果鍵
+    sources = list(results.keys())
+    if single_batch:
+        results = {key: parsed_jsons[0] for key, parsed_jsons in results.items()}
+        sources = [f"{key}.json" for key in sources]
+
+    # 保存JSON格式
+    json_output = {
+        "metadata": {
+            "sources": sources
+        },
+        "data": results
+    }
+
+    with open("triples_comparison_categorized.json", "wb") as f:
+        f.write(orjson.dumps(json_output, option=orjson.OPT_INDENT_2))
+
+    print("\n✓ 結果已儲存至:")
+    print("  - triples_comparison_categorized.txt (文本格式)")
+    print("  - triples_comparison_categorized.json (JSON格式)")
+
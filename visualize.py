@@ -4,10 +4,10 @@
 統一的知識圖譜可視化工具 - 支持完整圖和event高亮
 """
 
-import json
+import orjson
 import networkx as nx
 from pyvis.network import Network
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 COLOR_SCHEME = {
     "人物": "#FF6B6B",
@@ -39,9 +39,14 @@ CATEGORY_MAPPING = {
 
 
 def parse_triples(filename):
-    """從JSON文件解析三元組"""
-    with open(filename, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    """從JSON文件解析三元組
+
+    Returns:
+        tuple: (三元組列表, {事件編號: 事件名稱})，
+               每個三元組為 (event_seq, event_name, category, subject, relation, object)
+    """
+    with open(filename, "rb") as f:
+        data = orjson.loads(f.read())
 
     triples = []
     event_mapping = {}
@@ -59,28 +64,13 @@ def parse_triples(filename):
 
             if main_subjects:
                 main_subject = '和'.join(main_subjects)
-                triples.append({
-                    'event_seq': event_id_num,
-                    'event_name': event_name,
-                    'category': '事件',
-                    'subject': main_subject,
-                    'relation': '進行',
-                    'object': event_name
-                })
+                triples.append((event_id_num, event_name, '事件', main_subject, '進行', event_name))
 
             event_triples = event.get('triples', [])
             for i, triple in enumerate(event_triples, 1):
                 if isinstance(triple, list) and len(triple) >= 4:
                     subject, relation, obj, category = triple[0], triple[1], triple[2], triple[3]
-                    sub_event_id = f"{event_id_num}.{i}"
-                    triples.append({
-                        'event_seq': sub_event_id,
-                        'event_name': event_name,
-                        'category': category,
-                        'subject': subject,
-                        'relation': relation,
-                        'object': obj
-                    })
+                    triples.append((f"{event_id_num}.{i}", event_name, category, subject, relation, obj))
 
     return triples, event_mapping
 
@@ -98,46 +88,45 @@ def classify_entity(entity_name, category):
 
 
 def create_graph(triples):
-    """建立知識圖"""
-    G = nx.DiGraph()
-    entity_types = {}
+    """建立知識圖
 
-    for triple in triples:
-        subject = triple['subject']
-        relation = triple['relation']
-        obj = triple['object']
-        category = triple['category']
-        event_seq = triple['event_seq']
-        event_name = triple.get('event_name', '')
+    先在普通字典中累積節點與邊的屬性，最後一次性批量加入圖中。
+    """
+    node_attrs = {}
+    edge_attrs = {}
+    entity_types = {}
+    connections = Counter()
 
+    for event_seq, event_name, category, subject, relation, obj in triples:
         subject_type = classify_entity(subject, category)
         obj_type = classify_entity(obj, category)
 
         entity_types[subject] = subject_type
         entity_types[obj] = obj_type
 
-        if not G.has_node(subject):
-            G.add_node(subject, entity_type=subject_type, events={event_seq.split('.')[0]}, event_names={event_name} if event_name else set(), connections=0)
-        else:
-            G.nodes[subject]['events'].add(event_seq.split('.')[0])
+        event_id = event_seq.split('.', 1)[0]
+        for node, node_type in ((subject, subject_type), (obj, obj_type)):
+            attrs = node_attrs.get(node)
+            if attrs is None:
+                # 節點類型以首次出現時為準
+                attrs = node_attrs[node] = {'entity_type': node_type, 'events': set(), 'event_names': set()}
+            attrs['events'].add(event_id)
             if event_name:
-                G.nodes[subject]['event_names'].add(event_name)
+                attrs['event_names'].add(event_name)
+        connections[subject] += 1
+        connections[obj] += 1
 
-        if not G.has_node(obj):
-            G.add_node(obj, entity_type=obj_type, events={event_seq.split('.')[0]}, event_names={event_name} if event_name else set(), connections=0)
+        edge = edge_attrs.get((subject, obj))
+        if edge is None:
+            edge_attrs[(subject, obj)] = {'relations': [relation], 'categories': {category}, 'weight': 1, 'label': relation}
         else:
-            G.nodes[obj]['events'].add(event_seq.split('.')[0])
-            if event_name:
-                G.nodes[obj]['event_names'].add(event_name)
+            edge['relations'].append(relation)
+            edge['weight'] += 1
 
-        G.nodes[subject]['connections'] = G.nodes[subject].get('connections', 0) + 1
-        G.nodes[obj]['connections'] = G.nodes[obj].get('connections', 0) + 1
-
-        if G.has_edge(subject, obj):
-            G[subject][obj]['relations'].append(relation)
-            G[subject][obj]['weight'] += 1
-        else:
-            G.add_edge(subject, obj, relations=[relation], categories={category}, weight=1, label=relation)
+    G = nx.DiGraph()
+    G.add_nodes_from(node_attrs.items())
+    nx.set_node_attributes(G, connections, 'connections')
+    G.add_edges_from((u, v, attrs) for (u, v), attrs in edge_attrs.items())
 
     return G, entity_types
 
@@ -193,17 +182,22 @@ def visualize_graph(G, entity_types, focus_event=None, output_file='graph_analys
             if focus_event in G.nodes[node].get('events', set()):
                 highlighted_nodes.add(node)
 
-    # 添加節點
-    for node in G.nodes():
+    # 添加節點: 直接構建 pyvis 的節點字典列表，跳過逐個 add_node 的校驗與 get_nodes 線性查找
+    # (字段與 add_node 生成的一致: 設置了 font_color 時節點字體顏色被其覆蓋)
+    node_font = {'color': net.font_color}
+    highlight_color = {'background': '#FFFF00', 'border': '#FF0000'}
+    default_color = COLOR_SCHEME["關聯"]
+    nodes = []
+    for node, attrs in G.nodes(data=True):
         entity_type = entity_types.get(node, "關聯")
-        connections = G.nodes[node].get('connections', 0)
-        events = G.nodes[node].get('events', set())
-        event_names = G.nodes[node].get('event_names', set())
+        connections = attrs.get('connections', 0)
+        events = attrs.get('events', set())
+        event_names = attrs.get('event_names', set())
 
         is_highlighted = node in highlighted_nodes
 
         if is_highlighted:
-            color = COLOR_SCHEME.get(entity_type, COLOR_SCHEME["關聯"])
+            color = COLOR_SCHEME.get(entity_type, default_color)
             size = 50
             border = "#FF0000"
             border_width = 5
@@ -213,7 +207,7 @@ def visualize_graph(G, entity_types, focus_event=None, output_file='graph_analys
             border = "#666666"
             border_width = 2
         else:
-            color = COLOR_SCHEME.get(entity_type, COLOR_SCHEME["關聯"])
+            color = COLOR_SCHEME.get(entity_type, default_color)
             size = 30
             border = "#FFFFFF"
             border_width = 2
@@ -225,15 +219,29 @@ def visualize_graph(G, entity_types, focus_event=None, output_file='graph_analys
         if is_highlighted:
             hover_text += "<br><b style='color: #FF0000'>★ 高亮節點</b>"
 
-        net.add_node(node, label=node, color={'background': color, 'border': border, 'highlight': {'background': '#FFFF00', 'border': '#FF0000'}},
-                    size=size, title=hover_text, borderWidth=border_width, font={'color': 'white', 'size': 14})
+        nodes.append({
+            'color': {'background': color, 'border': border, 'highlight': highlight_color},
+            'size': size, 'title': hover_text, 'borderWidth': border_width, 'font': node_font,
+            'id': node, 'label': node, 'shape': 'dot'
+        })
 
-    # 添加邊
-    for source, target in G.edges():
-        if focus_event and (source not in highlighted_nodes and target not in highlighted_nodes):
-            continue
+    net.nodes = nodes
+    net.node_ids = [n['id'] for n in nodes]
+    net.node_map = {n['id']: n for n in nodes}
 
-        edge_data = G[source][target]
+    # 添加邊 (有向圖: 與 add_edge 一致地設置 arrows="to")
+    edge_font = {'color': 'white', 'size': 11}
+    edges = []
+    if focus_event:
+        # 只保留至少一端為高亮節點的邊
+        edges_iter = (
+            (source, target, edge_data) for source, target, edge_data in G.edges(data=True)
+            if source in highlighted_nodes or target in highlighted_nodes
+        )
+    else:
+        edges_iter = G.edges(data=True)
+
+    for source, target, edge_data in edges_iter:
         relations = edge_data.get('relations', [])
         weight = edge_data.get('weight', 1)
 
@@ -241,7 +249,10 @@ def visualize_graph(G, entity_types, focus_event=None, output_file='graph_analys
         color = "#FF6B6B" if weight > 2 else "#66D9EF"
         width = 3 if weight > 2 else 2
 
-        net.add_edge(source, target, label=label, color=color, width=width, font={'color': 'white', 'size': 11})
+        edges.append({'label': label, 'color': color, 'width': width, 'font': edge_font,
+                      'from': source, 'to': target, 'arrows': 'to'})
+
+    net.edges = edges
 
     net.save_graph(output_file)
     print(f"✓ 圖表已生成: {output_file}")
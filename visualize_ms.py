@@ -9,11 +9,22 @@
 4. 交互式 HTML 輸出
 """
 
-import json
+import collections
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import itertools
+import ijson
+import orjson
 import networkx as nx
 from pyvis.network import Network
 import os
 import math
+import sys
+
+try:
+    import louvain_numba as lvn  # 可選: Numba 編譯的 Louvain 實現，未安裝時使用 NetworkX 內置算法
+except ImportError:
+    lvn = None
 
 # ==========================================
 # 配置區域
@@ -62,6 +73,39 @@ STYLE_CONFIG = {
     }
 }
 
+# 按類型查找樣式，未配置的類型回退為默認樣式 (一次查找，無需每個節點 .get 兩次)
+_STYLE_BY_GROUP = collections.defaultdict(lambda: STYLE_CONFIG['groups']['default'])
+_STYLE_BY_GROUP.update(STYLE_CONFIG['groups'])
+
+# 不小於此大小 (字節) 的輸入文件以 ijson 流式解析，逐個數據源構建圖，不在內存中保留整份 JSON；
+# 較小的文件整體讀入 (orjson 解析更快)
+STREAM_PARSE_MIN_BYTES = 10 * 1024 * 1024
+
+# 並行構建各數據源子圖的最大進程數
+SOURCE_MAX_WORKERS = os.cpu_count() or 1
+
+# Louvain 參數 (resolution 控制社區的大小；固定 seed 使結果可重現)
+LOUVAIN_RESOLUTION = 1.0
+LOUVAIN_SEED = 42
+
+# 節點數少於此值時跳過 Louvain (小圖上的社區劃分意義不大)，節點按類型著色；
+# 仍以每個弱連通分量作為一個社區寫入 community 屬性，搜索腳本依賴導出數據中的社區信息
+LOUVAIN_MIN_NODES = 50
+
+# Louvain 結果緩存目錄 (相同的圖與參數直接重用上次的社區劃分)
+LOUVAIN_CACHE_DIR = ".louvain_cache"
+
+# GraphML 可直接寫出的屬性類型 (以 type() 精確匹配，集合查找代替 isinstance)
+_GRAPHML_SCALAR_TYPES = frozenset((str, int, float, bool))
+
+
+def _clean_graphml_value(v):
+    """將屬性值轉換為 GraphML 支持的類型 (None 為空字符串，其他非標量轉為字符串)"""
+    if v is None:
+        return ""
+    return v if type(v) in _GRAPHML_SCALAR_TYPES else str(v)
+
+
 # 物理引擎配置
 PHYSICS_CONFIG = """
 {
@@ -105,28 +149,42 @@ class KnowledgeGraphVisualizer:
     def __init__(self, input_file):
         self.input_file = input_file
         self.G = nx.DiGraph()
-        self.raw_data = self._load_data()
+        # 已加入圖中的 (源, 目標) 邊，關係處理時以集合查找代替 G.has_edge
+        self._edges_seen = set()
 
-    def _load_data(self):
-        """加載 JSON 數據"""
+    def _iter_sources(self):
+        """逐個返回輸入文件 data 下的 (數據源名稱, 數據)"""
         if not os.path.exists(self.input_file):
             print(f"❌ 錯誤: 找不到文件 {self.input_file}")
-            return {}
+            return
         try:
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            if os.path.getsize(self.input_file) < STREAM_PARSE_MIN_BYTES:
+                with open(self.input_file, 'rb') as f:
+                    raw_data = orjson.loads(f.read())
+                yield from raw_data.get('data', {}).items()
+            else:
+                with open(self.input_file, 'rb') as f:
+                    yield from ijson.kvitems(f, 'data', use_float=True)
         except Exception as e:
             print(f"❌ 讀取 JSON 失敗: {e}")
-            return {}
 
     def build_graph(self):
         """構建 NetworkX 圖"""
         print("🔄 正在構建圖譜結構...")
-        data_content = self.raw_data.get('data', {})
-
-        # 遍歷所有數據源 (如 'messages', 'summary')
-        for source_name, source_data in data_content.items():
-            self._process_source_data(source_data)
+        # 遍歷所有數據源 (如 'messages', 'summary')，大文件邊解析邊構建
+        sources = self._iter_sources()
+        first_sources = list(itertools.islice(sources, 2))
+        if len(first_sources) < 2:
+            # 只有一個數據源時直接在本進程構建，避免進程池的啟動與序列化開銷
+            for source_name, source_data in first_sources:
+                self._process_source_data(source_data)
+        else:
+            # 各數據源在進程池中並行構建為獨立子圖，再按數據源順序合併
+            for subgraph in self._build_source_graphs(itertools.chain(first_sources, sources)):
+                self._merge_source_graph(subgraph)
+
+        # 描述列表拼接為字符串，構建時的輔助屬性不會出現在導出數據與 HTML 中
+        self._finalize_descriptions()
 
         # 計算節點中心性以調整大小
         self._calculate_node_metrics()
@@ -138,14 +196,30 @@ class KnowledgeGraphVisualizer:
 
     def _apply_louvain_communities(self):
         """應用 Louvain 算法進行社區檢測並著色"""
+        if self.G.number_of_nodes() < LOUVAIN_MIN_NODES:
+            print(f"ℹ 圖譜只有 {self.G.number_of_nodes()} 個節點 (少於 {LOUVAIN_MIN_NODES})，跳過 Louvain 社區檢測，以連通分量作為社區，按類型著色")
+            components = nx.weakly_connected_components(self.G)
+            community_map = {node: i for i, component in enumerate(components) for node in component}
+            nx.set_node_attributes(self.G, community_map, 'community')
+            return
+
         print("🔍 正在應用 Louvain 算法進行社區檢測...")
         try:
             # Louvain 需要無向圖
             G_undirected = self.G.to_undirected()
 
-            # 使用 NetworkX 內置的 Louvain 算法
-            # resolution 參數控制社區的大小，默認 1.0
-            communities = nx.community.louvain_communities(G_undirected, seed=42)
+            # 緩存只是加速手段，計算緩存鍵或讀取失敗時直接運行社區檢測
+            try:
+                cache_path = self._louvain_cache_path(G_undirected)
+                communities = self._read_louvain_cache(cache_path)
+            except Exception as e:
+                print(f"⚠ 無法讀取 Louvain 緩存: {e}")
+                cache_path, communities = None, None
+
+            if communities is None:
+                communities = self._detect_communities_pruned(G_undirected)
+                if cache_path is not None:
+                    self._write_louvain_cache(cache_path, communities)
 
             print(f"✓ 檢測到 {len(communities)} 個社區")
 
@@ -157,16 +231,18 @@ class KnowledgeGraphVisualizer:
                 "#F1C40F", "#E74C3C", "#1ABC9C", "#8E44AD", "#2C3E50"
             ]
 
+            # 一次遍歷得到 {節點: 社區編號} 與 {節點: 顏色}，再批量寫入節點屬性
+            # (社區編號在 generate_html 中才寫入 Tooltip)
+            community_map = {}
+            color_map = {}
             for i, community in enumerate(communities):
                 color = palette[i % len(palette)]
                 for node in community:
-                    # 保存社區信息
-                    self.G.nodes[node]['community'] = i
-                    self.G.nodes[node]['community_color'] = color
+                    community_map[node] = i
+                    color_map[node] = color
 
-                    # 更新 title 添加社區信息
-                    current_title = self.G.nodes[node].get('title', '')
-                    self.G.nodes[node]['title'] = current_title + f"<br>Community: {i}"
+            nx.set_node_attributes(self.G, community_map, 'community')
+            nx.set_node_attributes(self.G, color_map, 'community_color')
 
         except Exception as e:
             print(f"⚠ Louvain 社區檢測失敗: {e}")
@@ -175,6 +251,171 @@ class KnowledgeGraphVisualizer:
                 if 'community_color' in self.G.nodes[node]:
                     del self.G.nodes[node]['community_color']
 
+    def _louvain_cache_path(self, G_undirected):
+        """以 BLAKE2b(算法實現, 參數, 節點, 帶權重的邊) 作為緩存鍵，返回緩存文件路徑
+
+        節點名稱可能混有不同類型 (如 LLM 返回數字實體名 2024)，因此按 repr 排序，不直接比較節點。
+        """
+        backend = 'louvain_numba' if lvn is not None else 'networkx'
+        nodes = sorted(map(repr, G_undirected.nodes()))
+        edges = sorted(
+            repr((*sorted((u, v), key=repr), weight))
+            for u, v, weight in G_undirected.edges(data='weight', default=1)
+        )
+        key_source = repr((backend, LOUVAIN_RESOLUTION, LOUVAIN_SEED, nodes, edges))
+        key = hashlib.blake2b(key_source.encode('utf-8')).hexdigest()
+        return os.path.join(LOUVAIN_CACHE_DIR, f"{key}.json")
+
+    def _read_louvain_cache(self, path):
+        """讀取緩存的 [節點, 社區編號] 列表，轉換為社區列表；未命中或緩存格式不符時返回 None"""
+        try:
+            with open(path, 'rb') as f:
+                partition = orjson.loads(f.read())
+
+            communities = {}
+            for node, community_id in partition:
+                communities.setdefault(community_id, set()).add(node)
+        except (FileNotFoundError, orjson.JSONDecodeError, TypeError, ValueError):
+            return None
+
+        return [communities[community_id] for community_id in sorted(communities)]
+
+    def _write_louvain_cache(self, path, communities):
+        """將社區劃分以 [節點, 社區編號] 列表寫入緩存
+
+        不使用 {節點: 社區編號} 字典: JSON 的鍵只能是字符串，數字等非字符串節點讀回後無法對應原節點。
+        """
+        partition = [[node, i] for i, community in enumerate(communities) for node in community]
+        try:
+            os.makedirs(LOUVAIN_CACHE_DIR, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(partition))
+        except (OSError, TypeError) as e:
+            print(f"⚠ 無法寫入 Louvain 緩存: {e}")
+
+    def _detect_communities_pruned(self, G_undirected):
+        """剪除葉子節點 (度數為 1) 後運行 Louvain，再讓葉子繼承唯一鄰居的社區
+
+        抽取得到的知識圖譜呈長尾分佈，大量實體只出現在一條關係中；這些葉子在局部移動階段
+        必然併入鄰居所在的社區，預先剪除可明顯減少 Louvain 的計算量。
+        孤立節點及只由葉子組成的連通分量 (兩個互連的葉子) 各自組成新的社區。
+        """
+        degrees = dict(G_undirected.degree())
+        leaves = [node for node, degree in degrees.items() if degree <= 1]
+        # 在副本上刪除葉子 (而非 subgraph)，保持節點順序與原圖一致，固定 seed 時結果可重現
+        G_core = G_undirected.copy()
+        G_core.remove_nodes_from(leaves)
+
+        # 葉子的邊權重折算為鄰居上的自環 (等同 Louvain 聚合階段把葉子併入鄰居)，
+        # 保持核心節點的加權度數不變，使核心圖上的模塊度與原圖一致
+        for node, degree in degrees.items():
+            if degree == 1:
+                neighbor = next(iter(G_undirected[node]))
+                if neighbor in G_core:
+                    weight = G_undirected[node][neighbor].get('weight', 1)
+                    if G_core.has_edge(neighbor, neighbor):
+                        G_core[neighbor][neighbor]['weight'] = G_core[neighbor][neighbor].get('weight', 1) + weight
+                    else:
+                        G_core.add_edge(neighbor, neighbor, weight=weight)
+
+        communities = self._detect_communities(G_core) if len(G_core) else []
+
+        community_of = {node: i for i, community in enumerate(communities) for node in community}
+        for node, degree in degrees.items():
+            if degree > 1:
+                continue
+            neighbor = next(iter(G_undirected[node]), None)
+            if neighbor in community_of:
+                i = community_of[neighbor]
+            else:
+                i = len(communities)
+                communities.append(set())
+            communities[i].add(node)
+            community_of[node] = i
+
+        return communities
+
+    def _detect_communities(self, G_undirected):
+        """運行 Louvain 算法，返回社區列表 (每個社區為節點集合)"""
+        if lvn is not None:
+            # louvain_numba 返回 {節點: 社區編號}，轉換為按編號排列的節點集合列表
+            partition = lvn.best_partition(G_undirected)
+            communities = {}
+            for node, community_id in partition.items():
+                communities.setdefault(community_id, set()).add(node)
+            return [communities[community_id] for community_id in sorted(communities)]
+
+        # 使用 NetworkX 內置的 Louvain 算法
+        return nx.community.louvain_communities(G_undirected, resolution=LOUVAIN_RESOLUTION, seed=LOUVAIN_SEED)
+
+    def _build_source_graphs(self, sources):
+        """在進程池中並行構建各數據源的子圖，按數據源順序逐個返回
+
+        最多同時提交 SOURCE_MAX_WORKERS * 2 個數據源，流式讀取大文件時不會把所有數據源一次讀入內存。
+        """
+        with ProcessPoolExecutor(max_workers=SOURCE_MAX_WORKERS) as executor:
+            pending = collections.deque()
+            for source_name, source_data in sources:
+                pending.append(executor.submit(_build_source_graph, source_data))
+                if len(pending) >= SOURCE_MAX_WORKERS * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _merge_source_graph(self, H):
+        """將單個數據源的子圖合併到 self.G，合併規則與順序處理時相同
+
+        已存在的節點: '未知' 類型更新為新類型，按順序追加未出現過的描述；
+        已存在的邊: 累加權重，按順序追加未出現過的描述。
+        """
+        new_nodes = []
+        for name, attrs in H.nodes(data=True):
+            # 子圖從工作進程反序列化而來，類型名重新駐留，使全圖共享同一字符串對象
+            etype = attrs.get('group', '未知')
+            if type(etype) is str:
+                etype = attrs['group'] = sys.intern(etype)
+
+            if not self.G.has_node(name):
+                new_nodes.append((name, attrs))
+                continue
+
+            node = self.G.nodes[name]
+            if node.get('group') == '未知' and etype != '未知':
+                node['group'] = etype
+
+            desc_set = node.setdefault('_desc_set', set())
+            for desc in attrs.get('description', ()):
+                if desc not in desc_set:
+                    desc_set.add(desc)
+                    node.setdefault('description', []).append(desc)
+
+        new_edges = []
+        for src, tgt, attrs in H.edges(data=True):
+            if (src, tgt) not in self._edges_seen:
+                new_edges.append((src, tgt, attrs))
+                continue
+
+            edge = self.G[src][tgt]
+            if 'weight' not in edge or 'weight' not in attrs:
+                # 舊格式 (Events) 的邊沒有權重，與順序處理時的 add_edge 相同，直接覆蓋屬性
+                edge.update(attrs)
+                continue
+
+            # 子圖中每條描述追加時的權重是相對於子圖的，加上合併前的權重即為順序處理時的總強度
+            base_weight = edge['weight']
+            edge['weight'] += attrs['weight']
+            desc_set = edge.setdefault('_desc_set', set())
+            for desc, desc_weight in zip(attrs.get('description', ()), attrs.get('_desc_weights', ())):
+                if desc and desc not in desc_set:
+                    desc_set.add(desc)
+                    edge['description'].append(desc)
+                    edge['_desc_weights'].append(base_weight + desc_weight)
+                    edge['_title_weight'] = base_weight + desc_weight
+
+        self.G.add_nodes_from(new_nodes)
+        self.G.add_edges_from(new_edges)
+        self._edges_seen.update((src, tgt) for src, tgt, _ in new_edges)
+
     def _process_source_data(self, source_data):
         """處理單個數據源的數據（支持字典或列表格式）"""
         if isinstance(source_data, list):
@@ -186,33 +427,44 @@ class KnowledgeGraphVisualizer:
     def _process_single_data_block(self, source_data):
         """處理單個數據塊"""
 
+        # 本數據塊新增的節點 / 邊先收集在字典中 (同一塊內的重複項直接在字典中合併)，
+        # 最後以 add_nodes_from / add_edges_from 一次性加入圖中
+        new_nodes = {}
+        new_edges = {}
+
         # 1. 處理實體 (Entities)
         if 'entities' in source_data:
             for entity in source_data['entities']:
                 name = entity.get('entity_name')
                 etype = entity.get('entity_type', '未知')
+                if type(etype) is str:
+                    # 類型名只有十餘種，駐留後所有節點共享同一字符串對象，不必每個節點各存一份
+                    etype = sys.intern(etype)
                 desc = entity.get('entity_description', '')
 
                 if name:
-                    if self.G.has_node(name):
-                        # 節點已存在，合併信息
+                    node = new_nodes.get(name)
+                    if node is None and self.G.has_node(name):
                         node = self.G.nodes[name]
+
+                    if node is not None:
+                        # 節點已存在，合併信息
                         # 如果類型是 '未知'，嘗試更新為新類型
                         if node.get('group') == '未知' and etype != '未知':
                             node['group'] = etype
 
-                        # 合併描述 (避免重複)
-                        current_desc = node.get('description', '')
-                        if desc and desc not in current_desc:
-                            new_desc = f"{current_desc}\n• {desc}" if current_desc else desc
-                            node['description'] = new_desc
-                            node['title'] = self._format_tooltip(name, node['group'], new_desc)
+                        # 合併描述 (以集合判斷重複，描述按順序追加到列表，構建完成後才拼接為字符串)
+                        desc_set = node.setdefault('_desc_set', set())
+                        if desc and desc not in desc_set:
+                            desc_set.add(desc)
+                            node.setdefault('description', []).append(desc)
                     else:
-                        # 新節點
-                        self.G.add_node(name,
-                                      group=etype,
-                                      title=self._format_tooltip(name, etype, desc),
-                                      description=desc)
+                        # 新節點 (Tooltip 在 generate_html 中按最終的類型與描述生成)
+                        new_nodes[name] = {
+                            'group': etype,
+                            'description': [desc] if desc else [],
+                            '_desc_set': {desc} if desc else set()
+                        }
 
         # 2. 處理關係 (Relationships)
         if 'relationships' in source_data:
@@ -224,31 +476,44 @@ class KnowledgeGraphVisualizer:
 
                 if src and tgt:
                     # 確保節點存在
-                    if not self.G.has_node(src):
-                        self.G.add_node(src, group='未知', title=src)
-                    if not self.G.has_node(tgt):
-                        self.G.add_node(tgt, group='未知', title=tgt)
+                    for endpoint in (src, tgt):
+                        if endpoint not in new_nodes and not self.G.has_node(endpoint):
+                            new_nodes[endpoint] = {'group': '未知'}
 
                     # 處理邊
-                    if self.G.has_edge(src, tgt):
-                        # 邊已存在，累加權重並合併描述
+                    key = (src, tgt)
+                    edge = new_edges.get(key)
+                    if edge is None and key in self._edges_seen:
                         edge = self.G[src][tgt]
+
+                    if edge is not None:
+                        # 邊已存在，累加權重並合併描述
                         edge['weight'] += strength
 
-                        current_desc = edge.get('description', '')
-                        if desc and desc not in current_desc:
-                            new_desc = f"{current_desc}\n• {desc}"
-                            edge['description'] = new_desc
-                            edge['title'] = f"總強度: {edge['weight']}\n描述:\n{new_desc}"
+                        desc_set = edge.setdefault('_desc_set', set())
+                        if desc and desc not in desc_set:
+                            desc_set.add(desc)
+                            edge['description'].append(desc)
+                            # 標題顯示追加描述時的總強度，在 _finalize_descriptions 中與描述一起生成；
+                            # 同時記錄每條描述追加時的權重，供合併數據源子圖時換算
+                            edge['_desc_weights'].append(edge['weight'])
+                            edge['_title_weight'] = edge['weight']
                     else:
                         # 新邊
                         # 標籤過長時截斷
                         label = desc[:10] + '...' if len(desc) > 10 else desc
-                        self.G.add_edge(src, tgt,
-                                      title=f"強度: {strength}\n描述: {desc}",
-                                      label=label,
-                                      weight=strength,
-                                      description=desc)
+                        new_edges[key] = {
+                            'title': f"強度: {strength}\n描述: {desc}",
+                            'label': label,
+                            'weight': strength,
+                            'description': [desc],
+                            '_desc_weights': [strength],
+                            '_desc_set': {desc} if desc else set()
+                        }
+
+        self.G.add_nodes_from(new_nodes.items())
+        self.G.add_edges_from((src, tgt, attrs) for (src, tgt), attrs in new_edges.items())
+        self._edges_seen.update(new_edges)
 
         # 3. 兼容舊格式 (Events)
         if 'events' in source_data:
@@ -271,6 +536,7 @@ class KnowledgeGraphVisualizer:
                     self.G.add_node(subj, group='未知', title=subj)
                     self.G.add_node(obj, group='未知', title=obj)
                     self.G.add_edge(subj, obj, label=rel, title=rel, group=cat)
+                    self._edges_seen.add((subj, obj))
 
     def _format_tooltip(self, name, etype, desc):
         """格式化 HTML Tooltip"""
@@ -282,11 +548,25 @@ class KnowledgeGraphVisualizer:
             html += f'<div style="max-width: 300px; white-space: pre-wrap; margin-top: 5px;">描述: {safe_desc}</div>'
         return html
 
+    def _finalize_descriptions(self):
+        """將節點與邊的描述列表一次性拼接為字符串，生成合併過描述的邊的 title，並移除 _desc_set 等輔助屬性"""
+        for _, attrs in self.G.nodes(data=True):
+            attrs.pop('_desc_set', None)
+            if isinstance(attrs.get('description'), list):
+                attrs['description'] = "\n• ".join(attrs['description'])
+        for _, _, attrs in self.G.edges(data=True):
+            attrs.pop('_desc_set', None)
+            attrs.pop('_desc_weights', None)
+            if isinstance(attrs.get('description'), list):
+                attrs['description'] = "\n• ".join(attrs['description'])
+            if '_title_weight' in attrs:
+                attrs['title'] = f"總強度: {attrs.pop('_title_weight')}\n描述:\n{attrs['description']}"
+
     def _calculate_node_metrics(self):
         """計算節點指標並存儲在節點屬性中"""
-        degrees = dict(self.G.degree())
-        for node in self.G.nodes():
-            self.G.nodes[node]['degree'] = degrees.get(node, 0)
+        # 直接遍歷度數視圖，一次寫入，不構建中間字典
+        for node, degree in self.G.degree():
+            self.G.nodes[node]['degree'] = degree
 
     def export_graph_data(self, output_prefix="graph_analysis"):
         """導出圖譜數據為標準格式 (JSON, GraphML)"""
@@ -297,8 +577,8 @@ class KnowledgeGraphVisualizer:
         try:
             data = nx.node_link_data(self.G)
             json_file = f"{output_prefix}_data.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with open(json_file, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             print(f"✅ JSON 數據已保存至: {json_file}")
         except Exception as e:
             print(f"❌ JSON 導出失敗: {e}")
@@ -306,16 +586,23 @@ class KnowledgeGraphVisualizer:
         # 2. 導出為 GraphML (可導入 Gephi, Cytoscape)
         try:
             graphml_file = f"{output_prefix}.graphml"
-            # GraphML 對數據類型比較敏感，創建一個副本進行清理
-            G_export = self.G.copy()
-            for node, attrs in G_export.nodes(data=True):
-                for k, v in attrs.items():
-                    if v is None:
-                        attrs[k] = ""
-                    elif not isinstance(v, (str, int, float, bool)):
-                        attrs[k] = str(v)
-
-            nx.write_graphml(G_export, graphml_file)
+            # GraphML 對數據類型比較敏感: 直接在原圖上清理需要轉換的值並記錄原值，
+            # 寫出後還原，無需複製整個圖
+            patches = []
+            for node, attrs in self.G.nodes(data=True):
+                # 只改寫需要清理的值，標量屬性保持原樣
+                cleaned = {k: _clean_graphml_value(v) for k, v in attrs.items()
+                           if type(v) not in _GRAPHML_SCALAR_TYPES}
+                if cleaned:
+                    patches.append((attrs, {k: attrs[k] for k in cleaned}))
+                    attrs.update(cleaned)
+
+            try:
+                # lxml 的 C 序列化器比 ElementTree 快且峰值內存更低；未安裝 lxml 時 networkx 自動回退至 ElementTree 寫出
+                nx.write_graphml_lxml(self.G, graphml_file)
+            finally:
+                for attrs, original in patches:
+                    attrs.update(original)
             print(f"✅ GraphML 結構已保存至: {graphml_file}")
         except Exception as e:
             print(f"⚠ GraphML 導出失敗: {e}")
@@ -335,7 +622,7 @@ class KnowledgeGraphVisualizer:
         # 添加節點
         for node, attrs in self.G.nodes(data=True):
             group = attrs.get('group', 'default')
-            style = STYLE_CONFIG['groups'].get(group, STYLE_CONFIG['groups']['default'])
+            style = _STYLE_BY_GROUP[group]
 
             # 動態大小: 基礎大小 + 度數 * 係數
             base_size = 20
@@ -345,10 +632,18 @@ class KnowledgeGraphVisualizer:
             # 優先使用社區顏色，如果沒有則使用組顏色
             node_color = attrs.get('community_color', style['color'])
 
+            # Tooltip 只在此處按最終的類型與描述生成一次 (舊格式節點保留其自帶的 title)
+            if 'title' in attrs:
+                title = attrs['title']
+            else:
+                title = self._format_tooltip(node, group, attrs.get('description', ''))
+            if 'community' in attrs:
+                title += f"<br>Community: {attrs['community']}"
+
             net.add_node(
                 node,
                 label=node,
-                title=attrs.get('title', node),
+                title=title,
                 group=group,
                 color=node_color,
                 shape=style['shape'],
@@ -393,6 +688,12 @@ class KnowledgeGraphVisualizer:
         except Exception as e:
             print(f"❌ 保存文件失敗: {e}")
 
+def _build_source_graph(source_data):
+    """進程池工作函數: 將單個數據源構建為獨立的子圖"""
+    builder = KnowledgeGraphVisualizer(None)
+    builder._process_source_data(source_data)
+    return builder.G
+
 def main():
     input_file = "triples_comparison_categorized.json"
     output_file = "graph_analysis.html"